@@ -1,6 +1,28 @@
 import os
+import re
+import io
+import time
 import binascii
-from typing import Union
+import contextlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Union, Iterator, Dict, List, Tuple
+
+# Анализ читает файл кусками такого размера (память не зависит от размера файла)
+SCAN_CHUNK_SIZE = 1024 * 1024
+_TOKEN_RE = re.compile(rb'([0-9A-F]{2})\|([0-9A-F])\|')
+_TOKEN_COUNT_RE = re.compile(rb'([0-9A-F]{2})\|[0-9A-F]\|')
+_HEX_CHARS = b'0123456789ABCDEF'
+_NON_HEX_CHARS = bytes(c for c in range(256) if c not in _HEX_CHARS)
+# Потоковый режим (stdin/stdout) читает данные блоками такого размера
+STREAM_BLOCK_SIZE = 1024 * 1024
+MAX_RUN = 255
+
+# Пакетный режим: файлы меньше BATCH_SMALL_FILE группируются в одну задачу
+# (до BATCH_GROUP_BYTES байт или BATCH_GROUP_FILES файлов)
+BATCH_SMALL_FILE = 256 * 1024
+BATCH_GROUP_BYTES = 8 * 1024 * 1024
+BATCH_GROUP_FILES = 512
 
 class MFCC:
     """
@@ -15,7 +37,14 @@ class MFCC:
             data = data.encode('utf-8')
         
         # Конвертируем в HEX строку
-        hex_str = data.hex().upper()
+        result = MFCC._encode_hex(data.hex().upper())
+        if result:
+            print(f"Кодирование: {len(data)} байт -> {len(result)} символов")
+        return result
+    
+    @staticmethod
+    def _encode_hex(hex_str: str) -> str:
+        """RLE строки HEX символов"""
         if not hex_str:
             return ""
         
@@ -25,7 +54,7 @@ class MFCC:
         
         # Проходим по всем символам HEX строки
         for i in range(1, len(hex_str)):
-            if hex_str[i] == current_char and count < 255:  # Максимум 255 повторов
+            if hex_str[i] == current_char and count < MAX_RUN:  # Максимум 255 повторов
                 count += 1
             else:
                 # Если повторов больше 3 - используем RLE сжатие
@@ -45,9 +74,7 @@ class MFCC:
             for _ in range(count):
                 encoded.append(current_char)
             
-        result = "".join(encoded)
-        print(f"Кодирование: {len(data)} байт -> {len(result)} символов")
-        return result
+        return "".join(encoded)
     
     @staticmethod
     def decode(compressed_data: str) -> bytes:
@@ -63,7 +90,7 @@ class MFCC:
         
         while i < length:
             # Если осталось достаточно символов для RLE блока (XX|Y|)
-            if (i + 4 <= length and 
+            if (i + 4 < length and 
                 compressed_data[i+2] == '|' and 
                 compressed_data[i+4] == '|'):
                 
@@ -186,45 +213,362 @@ class MFCC:
             traceback.print_exc()
             return False
     
+    @staticmethod
+    def _expand_hex(text: bytes) -> bytes:
+        """Разворачивает блоки XX|Y| в HEX символы (прочие символы отбрасываются)"""
+        hex_chars = _TOKEN_RE.sub(lambda m: m.group(2) * int(m.group(1), 16), text)
+        return hex_chars.translate(None, _NON_HEX_CHARS)
+    
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        """Имя временного файла рядом с path (для атомарной подмены через os.replace)"""
+        return os.path.join(os.path.dirname(os.path.abspath(path)), f".mfcc-{os.urandom(8).hex()}")
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _atomic_output(output_path: str, mode: str = 'wb'):
+        """
+        Открывает временный файл и после успешной записи переименовывает его в output_path
+        
+        При ошибке временный файл удаляется, а старый output_path остается как был.
+        """
+        tmp = MFCC._temp_path(output_path)
+        try:
+            with open(tmp, mode) as f:
+                yield f
+            os.replace(tmp, output_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+    
+    @staticmethod
+    def encode_stream(src, dst) -> "MFCCEncoder":
+        """
+        Сжимает бинарный поток src в dst блоками по STREAM_BLOCK_SIZE
+        
+        Подходит для stdin/stdout: память не зависит от объема данных,
+        результат совпадает с encode() от всех данных сразу.
+        """
+        encoder = MFCCEncoder()
+        for block in iter(lambda: src.read(STREAM_BLOCK_SIZE), b""):
+            dst.write(encoder.feed(block).encode('ascii'))
+        dst.write(encoder.flush().encode('ascii'))
+        dst.flush()
+        return encoder
+    
+    @staticmethod
+    def decode_stream(src, dst) -> "MFCCDecoder":
+        """Распаковывает бинарный поток src в dst блоками по STREAM_BLOCK_SIZE"""
+        decoder = MFCCDecoder()
+        for block in iter(lambda: src.read(STREAM_BLOCK_SIZE), b""):
+            dst.write(decoder.feed(block))
+        dst.write(decoder.flush())
+        dst.flush()
+        return decoder
+    
+    @staticmethod
+    def _iter_rle_pieces(f) -> Iterator[bytes]:
+        """
+        Читает MFCC текст кусками по SCAN_CHUNK_SIZE, не разрезая блоки XX|Y|
+        
+        Блоки не могут перекрываться (в XX|Y| на месте HEX цифр нет '|'), поэтому
+        достаточно не резать блок, начавшийся в последних 8 символах куска.
+        """
+        carry = b""
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            if not chunk:
+                if carry:
+                    yield carry
+                return
+            
+            buf = carry + chunk
+            cut = max(len(buf) - 4, 0)
+            match = _TOKEN_RE.search(buf, max(cut - 4, 0))
+            if match and match.start() < cut < match.end():
+                cut = match.start()
+            
+            yield buf[:cut]
+            carry = buf[cut:]
+    
+    @staticmethod
+    def scan_stats(file_path: str) -> Dict:
+        """
+        Потоковая статистика MFCC файла без распаковки
+        
+        Returns:
+            chars, pipes, hex_chars, tokens, token_examples (первые 5 блоков),
+            decoded_size (размер исходных данных в байтах)
+        """
+        stats = {"chars": 0, "pipes": 0, "hex_chars": 0, "tokens": 0, "token_examples": []}
+        counts = Counter()
+        
+        with open(file_path, 'rb') as f:
+            for piece in MFCC._iter_rle_pieces(f):
+                stats["chars"] += len(piece)
+                stats["pipes"] += piece.count(b'|')
+                stats["hex_chars"] += len(piece) - len(piece.translate(None, _HEX_CHARS))
+                
+                tokens = _TOKEN_COUNT_RE.findall(piece)
+                stats["tokens"] += len(tokens)
+                counts.update(tokens)
+                if tokens and len(stats["token_examples"]) < 5:
+                    for match in _TOKEN_RE.finditer(piece):
+                        stats["token_examples"].append((match.group(1).decode(), match.group(2).decode()))
+                        if len(stats["token_examples"]) == 5:
+                            break
+        
+        # Каждый блок XX|Y| содержит 3 HEX символа и раскрывается в int(XX) символов
+        literal_hex = stats["hex_chars"] - 3 * stats["tokens"]
+        decoded_hex = literal_hex + sum(int(count, 16) * n for count, n in counts.items())
+        stats["decoded_size"] = (decoded_hex + 1) // 2
+        return stats
+    
     @staticmethod
     def analyze_file(file_path: str):
-        """Анализирует структуру MFCC файла"""
+        """Анализирует структуру MFCC файла (потоково, без загрузки в память)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            stats = MFCC.scan_stats(file_path)
             
             print(f"🔍 Анализ MFCC файла: {file_path}")
-            print(f"📊 Общий размер: {len(content)} символов")
-            print(f"📍 Разделителей '|': {content.count('|')}")
-            print(f"🔢 RLE блоков: {content.count('|') // 2}")
+            print(f"📊 Общий размер: {stats['chars']} символов")
+            print(f"📍 Разделителей '|': {stats['pipes']}")
+            print(f"🔢 RLE блоков: {stats['pipes'] // 2}")
             
             # Статистика символов
-            hex_count = sum(1 for c in content if c in '0123456789ABCDEF')
-            other_count = len(content) - hex_count - content.count('|')
+            other_count = stats["chars"] - stats["hex_chars"] - stats["pipes"]
             
-            print(f"🔡 HEX символов: {hex_count}")
+            print(f"🔡 HEX символов: {stats['hex_chars']}")
             print(f"📝 Прочих символов: {other_count}")
+            print(f"📦 Исходный размер: {stats['decoded_size']} байт")
             
-            # Находим RLE блоки
-            import re
-            rle_pattern = r'([0-9A-F]{2})\|([0-9A-F])\|'
-            rle_matches = re.findall(rle_pattern, content)
-            
-            if rle_matches:
-                print(f"🎯 Найдено RLE блоков: {len(rle_matches)}")
+            if stats["tokens"]:
+                print(f"🎯 Найдено RLE блоков: {stats['tokens']}")
                 print("📋 Примеры RLE блоков:")
-                for i, (count, char) in enumerate(rle_matches[:5]):
+                for count, char in stats["token_examples"]:
                     print(f"   {count}|{char}| = {char} * {int(count, 16)}")
             
             # Превью содержимого
+            with open(file_path, 'rb') as f:
+                head = f.read(300)
+                f.seek(max(stats["chars"] - 200, 0))
+                tail = f.read()
+            
             print(f"\n👀 Первые 300 символов:")
-            print(content[:300])
+            print(head.decode('utf-8', errors='replace'))
             print(f"\n👁️ Последние 200 символов:")
-            print(content[-200:] if len(content) > 200 else content)
+            print(tail.decode('utf-8', errors='replace'))
             
         except Exception as e:
             print(f"❌ Ошибка анализа: {e}")
 
+    # === ПАКЕТНЫЙ РЕЖИМ ===
+    @staticmethod
+    def plan_batches(jobs: List[Tuple[str, str, int]]) -> List[List[Tuple[str, str]]]:
+        """
+        Раскладывает файлы по задачам пула: крупные - по одному, мелкие - группами
+        
+        Args:
+            jobs: Список (входной путь, выходной путь, размер)
+            
+        Returns:
+            Задачи (списки пар входной/выходной путь), самые тяжелые первыми
+        """
+        batches = []
+        group, group_bytes = [], 0
+        for input_path, output_path, size in sorted(jobs, key=lambda job: job[2], reverse=True):
+            if size >= BATCH_SMALL_FILE:
+                batches.append((size, [(input_path, output_path)]))
+                continue
+            group.append((input_path, output_path))
+            group_bytes += size
+            if group_bytes >= BATCH_GROUP_BYTES or len(group) >= BATCH_GROUP_FILES:
+                batches.append((group_bytes, group))
+                group, group_bytes = [], 0
+        if group:
+            batches.append((group_bytes, group))
+        
+        batches.sort(key=lambda batch: batch[0], reverse=True)
+        return [files for _, files in batches]
+    
+    @staticmethod
+    def _process_batch(mode: str, files: List[Tuple[str, str]]) -> List[Tuple]:
+        """
+        Выполняется в воркере: сжимает или распаковывает группу файлов
+        
+        Вывод encode_file/decode_file перехватывается и возвращается только
+        для неудачных файлов, чтобы сотни тысяч файлов не засоряли консоль.
+        Исключение на одном файле не прерывает группу: файл считается неудачным.
+        
+        Returns:
+            Список (входной путь, успех, байт прочитано, байт записано, лог)
+        """
+        worker = MFCC.encode_file if mode == "encode" else MFCC.decode_file
+        results = []
+        for input_path, output_path in files:
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                try:
+                    ok = worker(input_path, output_path)
+                    bytes_in = os.path.getsize(input_path) if ok else 0
+                    bytes_out = os.path.getsize(output_path) if ok else 0
+                except Exception as e:
+                    print(f"❌ Ошибка при обработке файла: {e}")
+                    ok, bytes_in, bytes_out = False, 0, 0
+            results.append((input_path, ok, bytes_in, bytes_out, "" if ok else log.getvalue()))
+        return results
+    
+    @staticmethod
+    def process_files_parallel(jobs: List[Tuple[str, str, int]], mode: str = "encode",
+                               max_workers: int = None) -> Dict:
+        """
+        Сжимает (mode="encode") или распаковывает (mode="decode") файлы в пуле процессов
+        
+        Задачи из plan_batches отправляются по мере освобождения воркеров,
+        в работе не больше 2 * max_workers задач. Ошибки печатаются сразу;
+        если задача упала целиком, все ее файлы считаются неудачными.
+        
+        Args:
+            jobs: Список (входной путь, выходной путь, размер)
+            max_workers: Число процессов (по умолчанию - число ядер)
+            
+        Returns:
+            files, ok, bytes_in, bytes_out, elapsed, max_workers, tasks
+        """
+        if max_workers is None or max_workers < 1:
+            max_workers = os.cpu_count() or 1
+        
+        batches = MFCC.plan_batches(jobs)
+        stats = {"files": len(jobs), "ok": 0, "bytes_in": 0, "bytes_out": 0,
+                 "max_workers": max_workers, "tasks": len(batches)}
+        started = time.perf_counter()
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = {}  # future -> файлы задачи
+            queue = iter(batches)
+            while True:
+                for files in queue:
+                    pending[pool.submit(MFCC._process_batch, mode, files)] = files
+                    if len(pending) >= 2 * max_workers:
+                        break
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        results = [(input_path, False, 0, 0, f"❌ Ошибка задачи: {e}")
+                                   for input_path, _ in files]
+                    for input_path, ok, bytes_in, bytes_out, log in results:
+                        if ok:
+                            stats["ok"] += 1
+                            stats["bytes_in"] += bytes_in
+                            stats["bytes_out"] += bytes_out
+                        else:
+                            print(f"❌ Ошибка: {input_path}")
+                            print(log.rstrip())
+        
+        stats["elapsed"] = time.perf_counter() - started
+        return stats
+    
+    @staticmethod
+    def print_batch_summary(stats: Dict, action: str):
+        """Печатает итог process_files_parallel с пропускной способностью"""
+        elapsed = max(stats["elapsed"], 1e-9)
+        print(f"📊 Итог: успешно {action} {stats['ok']}/{stats['files']} файлов "
+              f"({stats['tasks']} задач, {stats['max_workers']} процессов)")
+        print(f"📦 Прочитано: {stats['bytes_in']} байт, записано: {stats['bytes_out']} байт")
+        print(f"⏱️  Время: {elapsed:.2f} с, {stats['bytes_in']/(1024*1024)/elapsed:.1f} MB/s, "
+              f"{stats['files']/elapsed:.0f} файлов/с")
+
+class MFCCEncoder:
+    """
+    Инкрементальный кодер: куски данных любого размера в feed(), в конце flush()
+    
+    Незакрытая серия в конце куска переносится в следующий, поэтому склеенный
+    вывод совпадает с MFCC.encode() от всех данных сразу.
+    """
+    
+    def __init__(self):
+        self._carry = ""  # HEX символы незакрытой серии
+        self.bytes_in = 0
+        self.chars_out = 0
+    
+    def feed(self, data: Union[bytes, str]) -> str:
+        """Кодирует очередной кусок; возвращает готовую часть вывода (может быть пустой)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bytes_in += len(data)
+        
+        hex_str = self._carry + data.hex().upper()
+        self._carry = ""
+        if hex_str:
+            # Серия режется на куски по MAX_RUN от своего начала: полные куски
+            # выдаем сразу, остаток может продолжиться в следующем куске
+            tail = (len(hex_str) - len(hex_str.rstrip(hex_str[-1]))) % MAX_RUN
+            if tail:
+                hex_str, self._carry = hex_str[:-tail], hex_str[-tail:]
+        return self._output(MFCC._encode_hex(hex_str))
+    
+    def flush(self) -> str:
+        """Дописывает перенесенную серию; после flush() кодер можно использовать заново"""
+        hex_str, self._carry = self._carry, ""
+        return self._output(MFCC._encode_hex(hex_str))
+    
+    def _output(self, encoded: str) -> str:
+        self.chars_out += len(encoded)
+        return encoded
+
+
+class MFCCDecoder:
+    """
+    Инкрементальный декодер: текст любыми кусками в feed(), в конце flush()
+    
+    Блок XX|Y|, разрезанный границей куска, и непарная HEX цифра переносятся
+    в следующий кусок, поэтому склеенный вывод совпадает с MFCC.decode().
+    """
+    
+    def __init__(self):
+        self._carry = b""  # конец текста, где может начинаться незаконченный блок
+        self._nibble = b""  # непарная HEX цифра
+        self.chars_in = 0
+        self.bytes_out = 0
+    
+    def feed(self, text: Union[bytes, str]) -> bytes:
+        """Декодирует очередной кусок; возвращает готовые байты (может быть пусто)"""
+        if isinstance(text, str):
+            text = text.encode('utf-8')
+        self.chars_in += len(text)
+        
+        # Как в MFCC._iter_rle_pieces: не режем блок в последних 8 символах
+        buf = self._carry + text
+        cut = max(len(buf) - 4, 0)
+        match = _TOKEN_RE.search(buf, max(cut - 4, 0))
+        if match and match.start() < cut < match.end():
+            cut = match.start()
+        self._carry = buf[cut:]
+        
+        hex_chars = self._nibble + MFCC._expand_hex(buf[:cut])
+        even = len(hex_chars) - len(hex_chars) % 2
+        self._nibble = hex_chars[even:]
+        return self._output(bytes.fromhex(hex_chars[:even].decode('ascii')))
+    
+    def flush(self) -> bytes:
+        """Разбирает остаток; непарная цифра дополняется '0', как в decode()"""
+        hex_chars = self._nibble + MFCC._expand_hex(self._carry)
+        self._carry = self._nibble = b""
+        if len(hex_chars) % 2 != 0:
+            hex_chars += b'0'
+        return self._output(bytes.fromhex(hex_chars.decode('ascii')))
+    
+    def _output(self, data: bytes) -> bytes:
+        self.bytes_out += len(data)
+        return data
+
 def test_mfcc():
     """Тестирует работу кодекса"""
     print("=== 🧪 Тест MFCC с разделителями ===\n")
@@ -7,8 +7,12 @@ MFCC Compressor - MyFirstCoolCodec компрессор
 import os
 import sys
 import argparse
+import contextlib
 from MFCC import MFCC
 
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
 def compress_file(input_path, output_path=None):
     """
     Сжимает файл в формат MFCC
@@ -17,6 +21,9 @@ def compress_file(input_path, output_path=None):
         input_path: Путь к исходному файлу
         output_path: Путь для сохранения (если None, то input_path.mfcc)
     """
+    if STDIO in (input_path, output_path):
+        return compress_stream(input_path, output_path)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -27,14 +34,58 @@ def compress_file(input_path, output_path=None):
     print(f"🎯 Сжатие файла: {input_path}")
     return MFCC.encode_file(input_path, output_path)
 
-def compress_directory(directory_path, recursive=False):
+def compress_stream(input_path, output_path=None):
+    """
+    Потоковое сжатие, '-' - stdin/stdout (например, tar cf - . | compressor.py - | ssh ...)
+    
+    Данные читаются блоками, без загрузки в память; файл -o подменяется
+    только после успешной записи.
+    """
+    if output_path is None:
+        output_path = STDIO if input_path == STDIO else input_path + '.mfcc'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            encoder = MFCC.encode_stream(src, dst)
+    except Exception as e:
+        print(f"❌ Ошибка при потоковом сжатии: {e}")
+        return False
+    
+    print(f"✅ Поток сжат: {encoder.bytes_in} байт -> {encoder.chars_out} символов")
+    return True
+
+def _collect_files(directory_path, recursive=False):
+    """Список (файл, файл.mfcc, размер) для всех еще не сжатых файлов директории"""
+    if recursive:
+        paths = (os.path.join(root, filename)
+                 for root, dirs, files in os.walk(directory_path) for filename in files)
+    else:
+        paths = (os.path.join(directory_path, filename) for filename in os.listdir(directory_path))
+    
+    return [(path, path + '.mfcc', os.path.getsize(path))
+            for path in paths if os.path.isfile(path) and not path.endswith('.mfcc')]
+
+def compress_directory(directory_path, recursive=False, jobs=None):
     """
     Сжимает все файлы в директории
+    
+    Args:
+        jobs: Если задано - пакетный режим на пуле из jobs процессов
+              (0 - по числу ядер): крупные файлы первыми, мелкие группами
     """
     if not os.path.exists(directory_path):
         print(f"❌ Директория не найдена: {directory_path}")
         return False
     
+    if jobs is not None:
+        stats = MFCC.process_files_parallel(_collect_files(directory_path, recursive), "encode", jobs)
+        MFCC.print_batch_summary(stats, "сжато")
+        return stats["ok"] > 0
+    
     success_count = 0
     total_count = 0
     
@@ -70,30 +121,41 @@ def main():
   python compressor.py document.txt          # Сжать файл
   python compressor.py image.jpg -o img.mfcc # Сжать с указанием имени
   python compressor.py ./folder -r           # Сжать всю папку рекурсивно
+  python compressor.py ./logs -r -j 0        # Пакетно, на всех ядрах
+  tar cf - dir | python compressor.py - > dir.tar.mfcc  # stdin → stdout
         '''
     )
     
-    parser.add_argument('input', help='Путь к файлу или директории для сжатия')
-    parser.add_argument('-o', '--output', help='Путь для сохранения сжатого файла')
+    parser.add_argument('input', help="Путь к файлу или директории для сжатия ('-' - stdin)")
+    parser.add_argument('-o', '--output', help="Путь для сохранения сжатого файла ('-' - stdout)")
     parser.add_argument('-r', '--recursive', action='store_true', 
                        help='Рекурсивное сжатие всех файлов в директории')
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                       help='Пакетное сжатие директории в N процессов (0 - по числу ядер)')
     parser.add_argument('-v', '--version', action='version', version='MFCC Compressor 2.0')
     
     args = parser.parse_args()
     
-    print("🎉 === MFCC Compressor ===")
-    print("🚀 MyFirstCoolCodec - Ultimate Compression Technology")
-    print("📁 Формат с разделителями: COUNT|HEX|")
-    print("=" * 60)
-    
-    if os.path.isfile(args.input):
-        compress_file(args.input, args.output)
+    # Когда сжатые данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.input == STDIO and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        print("🎉 === MFCC Compressor ===")
+        print("🚀 MyFirstCoolCodec - Ultimate Compression Technology")
+        print("📁 Формат с разделителями: COUNT|HEX|")
+        print("=" * 60)
+        
+        if args.input == STDIO or os.path.isfile(args.input):
+            ok = compress_file(args.input, args.output)
+        
+        elif os.path.isdir(args.input):
+            ok = compress_directory(args.input, args.recursive, args.jobs)
+        
+        else:
+            print(f"❌ Ошибка: '{args.input}' не является файлом или директорией")
+            ok = False
     
-    elif os.path.isdir(args.input):
-        compress_directory(args.input, args.recursive)
-    
-    else:
-        print(f"❌ Ошибка: '{args.input}' не является файлом или директорией")
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -7,8 +7,12 @@ MFCC Opener - MyFirstCoolCodec декомпрессор
 import os
 import sys
 import argparse
+import contextlib
 from MFCC import MFCC
 
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
 def decompress_file(input_path, output_path=None):
     """
     Распаковывает файл из формата MFCC
@@ -17,6 +21,9 @@ def decompress_file(input_path, output_path=None):
         input_path: Путь к .mfcc файлу
         output_path: Путь для сохранения (если None, убирает .mfcc расширение)
     """
+    if STDIO in (input_path, output_path):
+        return decompress_stream(input_path, output_path)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -34,14 +41,63 @@ def decompress_file(input_path, output_path=None):
     print(f"🎯 Распаковка файла: {input_path}")
     return MFCC.decode_file(input_path, output_path)
 
-def decompress_directory(directory_path, recursive=False):
+def decompress_stream(input_path, output_path=None):
+    """
+    Потоковая распаковка, '-' - stdin/stdout (например, cat a.mfcc | open.py - | tar xf -)
+    
+    Данные читаются блоками, без загрузки в память; файл -o подменяется
+    только после успешной записи.
+    """
+    if output_path is None:
+        if input_path == STDIO:
+            output_path = STDIO
+        elif input_path.endswith('.mfcc'):
+            output_path = input_path[:-5]
+        else:
+            output_path = input_path + '.decompressed'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            decoder = MFCC.decode_stream(src, dst)
+    except Exception as e:
+        print(f"❌ Ошибка при потоковой распаковке: {e}")
+        return False
+    
+    print(f"✅ Поток распакован: {decoder.bytes_out} байт")
+    return True
+
+def _collect_files(directory_path, recursive=False):
+    """Список (файл.mfcc, файл, размер) для всех .mfcc файлов директории"""
+    if recursive:
+        paths = (os.path.join(root, filename)
+                 for root, dirs, files in os.walk(directory_path) for filename in files)
+    else:
+        paths = (os.path.join(directory_path, filename) for filename in os.listdir(directory_path))
+    
+    return [(path, path[:-5], os.path.getsize(path))
+            for path in paths if path.endswith('.mfcc') and os.path.isfile(path)]
+
+def decompress_directory(directory_path, recursive=False, jobs=None):
     """
     Распаковывает все .mfcc файлы в директории
+    
+    Args:
+        jobs: Если задано - пакетный режим на пуле из jobs процессов
+              (0 - по числу ядер): крупные файлы первыми, мелкие группами
     """
     if not os.path.exists(directory_path):
         print(f"❌ Директория не найдена: {directory_path}")
         return False
     
+    if jobs is not None:
+        stats = MFCC.process_files_parallel(_collect_files(directory_path, recursive), "decode", jobs)
+        MFCC.print_batch_summary(stats, "распаковано")
+        return stats["ok"] > 0
+    
     success_count = 0
     total_count = 0
     
@@ -77,16 +133,20 @@ def main():
   python open.py document.txt.mfcc          # Распаковать файл
   python open.py image.mfcc -o restored.jpg # Распаковать с указанием имени
   python open.py ./folder -r                # Распаковать всю папку рекурсивно
+  python open.py ./logs -r -j 0             # Пакетно, на всех ядрах
+  cat dir.tar.mfcc | python open.py - | tar xf -  # stdin → stdout
   python open.py file.mfcc -a               # Проанализировать файл
         '''
     )
     
-    parser.add_argument('input', help='Путь к .mfcc файлу или директории')
-    parser.add_argument('-o', '--output', help='Путь для сохранения распакованного файла')
+    parser.add_argument('input', help="Путь к .mfcc файлу или директории ('-' - stdin)")
+    parser.add_argument('-o', '--output', help="Путь для сохранения распакованного файла ('-' - stdout)")
     parser.add_argument('-a', '--analyze', action='store_true', 
                        help='Проанализировать структуру MFCC файла без распаковки')
     parser.add_argument('-r', '--recursive', action='store_true',
                        help='Рекурсивная распаковка всех .mfcc файлов в директории')
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                       help='Пакетная распаковка директории в N процессов (0 - по числу ядер)')
     parser.add_argument('-v', '--version', action='store_true', 
                        help='Показать версию')
     
@@ -96,23 +156,30 @@ def main():
         print("MFCC Opener 2.0")
         return
     
-    print("🎉 === MFCC File Opener ===")
-    print("🚀 MyFirstCoolCodec - Ultimate Decompression Technology")
-    print("🔍 Формат с разделителями: COUNT|HEX|")
-    print("=" * 60)
-    
-    if args.analyze and os.path.isfile(args.input):
-        MFCC.analyze_file(args.input)
-        return
-    
-    if os.path.isfile(args.input):
-        decompress_file(args.input, args.output)
-    
-    elif os.path.isdir(args.input):
-        decompress_directory(args.input, args.recursive)
+    # Когда распакованные данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.input == STDIO and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        print("🎉 === MFCC File Opener ===")
+        print("🚀 MyFirstCoolCodec - Ultimate Decompression Technology")
+        print("🔍 Формат с разделителями: COUNT|HEX|")
+        print("=" * 60)
+        
+        if args.analyze and os.path.isfile(args.input):
+            MFCC.analyze_file(args.input)
+            return
+        
+        if args.input == STDIO or os.path.isfile(args.input):
+            ok = decompress_file(args.input, args.output)
+        
+        elif os.path.isdir(args.input):
+            ok = decompress_directory(args.input, args.recursive, args.jobs)
+        
+        else:
+            print(f"❌ Ошибка: '{args.input}' не является файлом или директорией")
+            ok = False
     
-    else:
-        print(f"❌ Ошибка: '{args.input}' не является файлом или директорией")
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,48 @@
 import os
+import re
 import json
-from typing import Union, List, Dict
+import zlib
+import hashlib
+import contextlib
+from collections import deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union, List, Dict, Iterable, Iterator, Tuple, Callable
+
+# Заголовок формата - первая строка файла; для определения режима
+# достаточно прочитать ее, а не распаковывать весь файл
+HEADER_MAX_LEN = 256
+NOSPLIT_FORMAT = "MFCC_NOSPLIT"
+# Nosplit начинается этой строкой вместо JSON: в ней нет HEX цифр (0-9, A-F)
+# и '|', поэтому старые декодеры (и 1/, 3/) пропускают ее, как прочий мусор
+NOSPLIT_MAGIC = b"#mfcc-nosplit\n"
+# Старые файлы без заголовка: split архив - это RLE от JSON с таким началом
+LEGACY_SPLIT_PREFIX = b'{\n  "metadata": {\n    "version": "MFCC-SPLIT-'
+LEGACY_SPLIT_CONTENT = b'\n  },\n  "content": '
+
+# Анализ читает файл кусками такого размера (память не зависит от размера файла)
+SCAN_CHUNK_SIZE = 1024 * 1024
+_TOKEN_RE = re.compile(rb'([0-9A-F]{2})\|([0-9A-F])\|')
+_TOKEN_COUNT_RE = re.compile(rb'([0-9A-F]{2})\|[0-9A-F]\|')
+_HEX_CHARS = b'0123456789ABCDEF'
+_NON_HEX_CHARS = bytes(c for c in range(256) if c not in _HEX_CHARS)
+# Потоковые nosplit файлы читаются блоками такого размера (MFCCEncoder/MFCCDecoder)
+STREAM_BLOCK_SIZE = 1024 * 1024
+MAX_RUN = 255
+
+# Индексированный split архив: заголовок, записи подряд, центральный каталог
+# и трейлер фиксированной длины со смещением каталога (как в zip)
+SPLIT_FORMAT = "MFCC_SPLIT"
+SPLIT_HEADER_PREFIX = b'{"format": "' + SPLIT_FORMAT.encode('ascii') + b'"'
+SPLIT_VERSION = 2
+SPLIT_TRAILER_MARK = b"#MFCC-DIR "
+SPLIT_TRAILER_LEN = len(SPLIT_TRAILER_MARK) + 20 + 1
+SPLIT_DIRECTORY_PREFIX = b'{"entries": '
+SPLIT_BLOCK_SIZE = 4 * 1024 * 1024
+# Мелкие файлы отдаются воркерам пачками, чтобы не платить за IPC на каждый файл
+SPLIT_BATCH_BYTES = 4 * 1024 * 1024
+SPLIT_BATCH_FILES = 256
+# Одинаковые файлы хранятся одним блобом, ключ - BLAKE2b хеш содержимого
+SPLIT_DIGEST_SIZE = 16
 
 class MFCC:
     """
@@ -16,7 +58,11 @@ class MFCC:
         if isinstance(data, str):
             data = data.encode('utf-8')
         
-        hex_str = data.hex().upper()
+        return MFCC._encode_hex(data.hex().upper())
+    
+    @staticmethod
+    def _encode_hex(hex_str: str) -> str:
+        """RLE строки HEX символов"""
         if not hex_str:
             return ""
         
@@ -25,7 +71,7 @@ class MFCC:
         current_char = hex_str[0]
         
         for i in range(1, len(hex_str)):
-            if hex_str[i] == current_char and count < 255:
+            if hex_str[i] == current_char and count < MAX_RUN:
                 count += 1
             else:
                 if count > 3:
@@ -52,7 +98,7 @@ class MFCC:
         i = 0
         
         while i < len(compressed_data):
-            if (i + 4 <= len(compressed_data) and 
+            if (i + 4 < len(compressed_data) and 
                 compressed_data[i+2] == '|' and 
                 compressed_data[i+4] == '|'):
                 
@@ -79,6 +125,17 @@ class MFCC:
         
         return bytes.fromhex(hex_str)
     
+    @staticmethod
+    def _expand_hex(text: bytes) -> bytes:
+        """
+        Разворачивает токены текста в HEX символы (прочие символы отбрасываются)
+        
+        Токены не перекрываются, поэтому регулярное выражение находит те же
+        токены, что и посимвольный проход decode_nosplit.
+        """
+        hex_chars = _TOKEN_RE.sub(lambda m: m.group(2) * int(m.group(1), 16), text)
+        return hex_chars.translate(None, _NON_HEX_CHARS)
+    
     # === SPLIT MODE ===
     @staticmethod
     def encode_split(files_data: Dict[str, bytes]) -> str:
@@ -135,21 +192,514 @@ class MFCC:
         
         return result
     
-    # === FILE OPERATIONS ===
+    # === ИНДЕКСИРОВАННЫЙ SPLIT АРХИВ ===
     @staticmethod
-    def encode_file_nosplit(input_path: str, output_path: str) -> bool:
-        """Сжимает один файл в режиме nosplit"""
+    def _iter_split_inputs(input_paths: List[str]) -> Iterator[Tuple[str, str]]:
+        """Обходит входные пути и лениво выдает пары (имя в архиве, путь к файлу)"""
+        for path in input_paths:
+            if os.path.isfile(path):
+                yield os.path.basename(path), path
+            elif os.path.isdir(path):
+                base_dir = os.path.dirname(os.path.abspath(path))
+                for root, dirs, files in os.walk(path):
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        # Сохраняем относительный путь (с '/' как разделителем)
+                        rel_path = os.path.relpath(os.path.abspath(file_path), base_dir)
+                        yield rel_path.replace(os.sep, '/'), file_path
+    
+    @staticmethod
+    def _scan_file(file_path: str) -> Tuple[str, int, int]:
+        """Возвращает BLAKE2b хеш содержимого файла (hex), его размер и crc32 за одно чтение"""
+        digest = hashlib.blake2b(digest_size=SPLIT_DIGEST_SIZE)
+        size = 0
+        crc = 0
+        with open(file_path, 'rb') as src:
+            while True:
+                block = src.read(SPLIT_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+                crc = zlib.crc32(block, crc)
+        return digest.hexdigest(), size, crc
+    
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """Возвращает BLAKE2b хеш содержимого файла (hex)"""
+        return MFCC._scan_file(file_path)[0]
+    
+    @staticmethod
+    def _scan_split_batch(batch: List[Tuple[str, str]]) -> List[Tuple[str, str, int, str, int, int]]:
+        """
+        Хеширует пачку пар (имя, путь) (выполняется в воркере или в основном процессе)
+        
+        Returns:
+            Для каждого файла: (имя, путь, mtime, хеш, размер, crc32)
+        """
+        results = []
+        for name, file_path in batch:
+            # mtime берется до чтения: правка во время сжатия заметна при следующем update
+            mtime = os.stat(file_path).st_mtime_ns
+            results.append((name, file_path, mtime) + MFCC._scan_file(file_path))
+        return results
+    
+    @staticmethod
+    def _hash_split_inputs(entries: Iterable[Tuple[str, str]], seen: set, pool=None,
+                           max_in_flight: int = 1) -> Iterator[Tuple[str, str, str, bool, int, int, int]]:
+        """
+        Добавляет к парам (имя, путь) хеш содержимого, признак первой копии, mtime,
+        размер и crc32. Повторные копии не сжимаются, а ссылаются на уже записанный блоб
+        
+        Args:
+            seen: Хеши уже записанных блобов, пополняется по ходу обхода
+            pool: Пул процессов: файлы хешируются пачками в нем, в порядке обхода
+                  (не больше max_in_flight пачек в работе); None - в этом процессе
+        """
+        batches = MFCC._batch_split_items(entries, lambda entry: os.path.getsize(entry[1]))
+        if pool is None:
+            scanned = map(MFCC._scan_split_batch, batches)
+        else:
+            scanned = MFCC._imap_ordered(pool, MFCC._scan_split_batch, batches, max_in_flight)
+        for results in scanned:
+            for name, file_path, mtime, digest, size, crc in results:
+                # Дубликаты определяются здесь, по порядку обхода: сжимается первая копия
+                yield name, file_path, digest, digest not in seen, mtime, size, crc
+                seen.add(digest)
+    
+    @staticmethod
+    def _write_split_entry(f, name: str, file_path: str) -> Dict:
+        """
+        Сжимает файл в архив кусками по SPLIT_BLOCK_SIZE байт.
+        Токены не пересекают границу куска, поэтому склеенный результат
+        распаковывается так же, как результат одного вызова encode_nosplit
+        
+        Returns:
+            Запись каталога
+        """
+        offset = f.tell()
+        compressed_size = 0
+        original_size = 0
+        crc = 0
+        with open(file_path, 'rb') as src:
+            while True:
+                block = src.read(SPLIT_BLOCK_SIZE)
+                if not block:
+                    break
+                compressed = MFCC.encode_nosplit(block).encode('ascii')
+                f.write(compressed)
+                compressed_size += len(compressed)
+                original_size += len(block)
+                crc = zlib.crc32(block, crc)
+        f.write(b"\n")
+        return {
+            "name": name,
+            "offset": offset,
+            "compressed_size": compressed_size,
+            "original_size": original_size,
+            "crc32": crc
+        }
+    
+    @staticmethod
+    def _imap_ordered(pool, fn, tasks, max_in_flight: int):
+        """
+        Отдает результаты fn(task) в порядке задач (буфер переупорядочивания)
+        
+        В работе одновременно не больше max_in_flight задач, поэтому порядок
+        записей в архиве не зависит от того, какой воркер закончил первым.
+        """
+        pending = deque()
         try:
-            with open(input_path, 'rb') as f:
-                data = f.read()
+            for task in tasks:
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+                pending.append(pool.submit(fn, task))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _batch_split_items(items: Iterable, size_of: Callable) -> Iterator[List]:
+        """Группирует элементы в пачки до SPLIT_BATCH_FILES штук и SPLIT_BATCH_BYTES байт"""
+        batch = []
+        batch_bytes = 0
+        for item in items:
+            size = size_of(item)
+            if batch and (len(batch) >= SPLIT_BATCH_FILES or batch_bytes + size > SPLIT_BATCH_BYTES):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(item)
+            batch_bytes += size
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _split_pieces(hashed: Iterable[Tuple]) -> Iterator[Tuple[Tuple, int, int, bool]]:
+        """
+        Режет файлы из _hash_split_inputs на куски (запись, смещение, длина, последний)
+        по SPLIT_BLOCK_SIZE байт. Повторная копия или пустой файл - один кусок длины 0
+        """
+        for item in hashed:
+            size = item[5] if item[3] else 0
+            offset = 0
+            while True:
+                length = min(SPLIT_BLOCK_SIZE, size - offset)
+                yield item, offset, length, offset + length >= size
+                offset += length
+                if offset >= size:
+                    break
+    
+    @staticmethod
+    def _encode_split_batch(batch: List[Tuple[Tuple, int, int, bool]]) -> List[Tuple]:
+        """
+        Сжимает пачку кусков файлов (выполняется в воркере)
+        
+        Куски режутся по той же границе SPLIT_BLOCK_SIZE, что и в _write_split_entry,
+        поэтому склеенный результат совпадает с последовательной записью.
+        
+        Returns:
+            Для каждого куска: (запись, смещение, последний, сжатые данные);
+            для повторных копий вместо сжатых данных None
+        """
+        results = []
+        for item, offset, length, last in batch:
+            if not item[3]:
+                results.append((item, offset, last, None))
+                continue
+            with open(item[1], 'rb') as src:
+                src.seek(offset)
+                block = src.read(length)
+            if len(block) != length:
+                raise ValueError(f"Файл изменился во время сжатия: {item[1]}")
+            results.append((item, offset, last, MFCC.encode_nosplit(block).encode('ascii')))
+        return results
+    
+    @staticmethod
+    def _extract_split_batch(task: Tuple[str, List[Tuple[Dict, str]]]) -> List[str]:
+        """
+        Распаковывает пачку записей в готовые файлы (выполняется в воркере)
+        
+        Returns:
+            Имена извлеченных записей
+        """
+        input_path, batch = task
+        with open(input_path, 'rb') as f:
+            for entry, file_path in batch:
+                with open(file_path, 'wb') as out:
+                    out.write(MFCC._read_entry(f, entry))
+        return [entry["name"] for entry, _ in batch]
+    
+    @staticmethod
+    def _write_split_blobs(f, entries: Iterable[Tuple[str, str]], blobs: Dict[str, Dict],
+                           max_workers: int = 1) -> List[Dict]:
+        """
+        Пишет сжатые блобы с текущей позиции f (по строке на уникальное содержимое).
+        Записи с одинаковым содержимым ссылаются на один блоб.
+        
+        При max_workers == 1 файлы читаются по мере записи, в памяти держится
+        только каталог. Иначе и хеширование, и сжатие идут в пуле процессов:
+        файлы режутся на куски по SPLIT_BLOCK_SIZE, куски сжимаются пачками,
+        а записи пишутся в порядке обхода; на каждом этапе в работе не больше
+        2 * max_workers пачек по SPLIT_BATCH_BYTES исходных байт, какого бы
+        размера ни были файлы.
+        
+        Args:
+            entries: Пары (имя в архиве, путь к файлу)
+            blobs: Хеш -> запись каталога уже записанного блоба, пополняется
+            max_workers: Количество процессов
+        
+        Returns:
+            Записи каталога для entries
+        """
+        directory = []
+        if max_workers <= 1:
+            hashed = MFCC._hash_split_inputs(entries, set(blobs))
+            for name, file_path, digest, is_new, mtime, _, _ in hashed:
+                if is_new:
+                    blobs[digest] = MFCC._write_split_entry(f, name, file_path)
+                    blobs[digest]["blake2b"] = digest
+                directory.append(dict(blobs[digest], name=name, mtime=mtime))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                # Хеширование идет в том же пуле, на шаг впереди сжатия
+                hashed = MFCC._hash_split_inputs(entries, set(blobs), pool, 2 * max_workers)
+                batches = MFCC._batch_split_items(MFCC._split_pieces(hashed), lambda piece: piece[2])
+                for results in MFCC._imap_ordered(pool, MFCC._encode_split_batch,
+                                                  batches, 2 * max_workers):
+                    for item, offset, last, compressed in results:
+                        name, _, digest, _, mtime, original_size, crc = item
+                        if compressed is not None:
+                            if offset == 0:
+                                # Размер и crc32 посчитаны при хешировании
+                                blobs[digest] = {
+                                    "name": name,
+                                    "offset": f.tell(),
+                                    "compressed_size": 0,
+                                    "original_size": original_size,
+                                    "crc32": crc,
+                                    "blake2b": digest
+                                }
+                            f.write(compressed)
+                            blobs[digest]["compressed_size"] += len(compressed)
+                            if last:
+                                f.write(b"\n")
+                        if last:
+                            directory.append(dict(blobs[digest], name=name, mtime=mtime))
+        return directory
+    
+    @staticmethod
+    def _write_split_directory(f, directory: List[Dict]):
+        """Пишет центральный каталог с текущей позиции f и трейлер с его смещением"""
+        directory_offset = f.tell()
+        f.write((json.dumps({"entries": directory}) + "\n").encode('ascii'))
+        f.write(SPLIT_TRAILER_MARK + f"{directory_offset:020d}\n".encode('ascii'))
+    
+    @staticmethod
+    def _write_split_archive(entries: Iterable[Tuple[str, str]], output_path: str,
+                             max_workers: int = 1) -> List[Dict]:
+        """
+        Пишет архив: строка заголовка, затем сжатые блобы,
+        затем центральный каталог одной JSON строкой и трейлер
+        
+        Returns:
+            Записи каталога
+        """
+        with open(output_path, 'wb') as f:
+            f.write((json.dumps({"format": SPLIT_FORMAT, "version": SPLIT_VERSION}) + "\n").encode('ascii'))
+            directory = MFCC._write_split_blobs(f, entries, {}, max_workers)
+            MFCC._write_split_directory(f, directory)
+        
+        return directory
+    
+    @staticmethod
+    def is_split_archive(path: str) -> bool:
+        """Проверяет, что файл - индексированный split архив (по строке заголовка)"""
+        with open(path, 'rb') as f:
+            return f.readline(HEADER_MAX_LEN).startswith(SPLIT_HEADER_PREFIX)
+    
+    @staticmethod
+    def _check_trailer(f, pos: int) -> Union[int, None]:
+        """Смещение каталога из трейлера в позиции pos или None, если трейлер не целый"""
+        f.seek(pos)
+        trailer = f.read(SPLIT_TRAILER_LEN)
+        digits = trailer[len(SPLIT_TRAILER_MARK):-1]
+        if (len(trailer) != SPLIT_TRAILER_LEN or not trailer.startswith(SPLIT_TRAILER_MARK)
+                or not trailer.endswith(b"\n") or not digits.isdigit()):
+            return None
+        
+        # Каталог - одна JSON строка, которая кончается прямо перед трейлером
+        offset = int(digits)
+        if offset >= pos:
+            return None
+        f.seek(pos - 1)
+        if f.read(1) != b"\n":
+            return None
+        f.seek(offset)
+        if f.read(len(SPLIT_DIRECTORY_PREFIX)) != SPLIT_DIRECTORY_PREFIX:
+            return None
+        return offset
+    
+    @staticmethod
+    def _read_directory_offset(f) -> int:
+        """
+        Возвращает смещение центрального каталога из последнего целого трейлера
+        
+        Обычно это последние SPLIT_TRAILER_LEN байт файла. Если после трейлера
+        есть что-то еще (update прерван или идет прямо сейчас), трейлер ищется
+        с конца: в блобах только HEX, '|' и переводы строк, а каталог - одна
+        JSON строка, поэтому строка с SPLIT_TRAILER_MARK бывает только трейлером.
+        """
+        size = f.seek(0, os.SEEK_END)
+        if size >= SPLIT_TRAILER_LEN:
+            offset = MFCC._check_trailer(f, size - SPLIT_TRAILER_LEN)
+            if offset is not None:
+                return offset
+        
+        needle = b"\n" + SPLIT_TRAILER_MARK
+        end = size
+        while end > 0:
+            # Блоки перекрываются, чтобы не пропустить трейлер на границе
+            start = max(0, end - SPLIT_BLOCK_SIZE)
+            f.seek(start)
+            block = f.read(end - start + len(needle))
+            pos = block.rfind(needle)
+            while pos != -1:
+                offset = MFCC._check_trailer(f, start + pos + 1)
+                if offset is not None:
+                    return offset
+                pos = block.rfind(needle, 0, pos)
+            end = start
+        
+        raise ValueError("Архив поврежден: нет трейлера")
+    
+    @staticmethod
+    def _read_directory(f) -> List[Dict]:
+        """Читает центральный каталог по смещению из трейлера"""
+        f.seek(MFCC._read_directory_offset(f))
+        return json.loads(f.readline().decode('ascii'))["entries"]
+    
+    @staticmethod
+    def read_split_directory(archive_path: str) -> List[Dict]:
+        """Список записей архива (name, offset, размеры, crc32) без распаковки"""
+        with open(archive_path, 'rb') as f:
+            return MFCC._read_directory(f)
+    
+    @staticmethod
+    def _read_entry(f, entry: Dict) -> bytes:
+        """Читает и распаковывает одну запись, проверяя размер и контрольную сумму"""
+        f.seek(entry["offset"])
+        data = MFCC.decode_nosplit(f.read(entry["compressed_size"]).decode('ascii'))
+        if len(data) != entry["original_size"] or zlib.crc32(data) != entry["crc32"]:
+            raise ValueError(f"Контрольная сумма не совпадает: {entry['name']}")
+        return data
+    
+    @staticmethod
+    def extract_one(archive_path: str, name: str) -> bytes:
+        """
+        Извлекает один файл из архива, читая только каталог и нужную запись
+        
+        Args:
+            name: имя записи (относительный путь) или имя файла, если оно уникально
+        """
+        with open(archive_path, 'rb') as f:
+            directory = MFCC._read_directory(f)
+            matches = [entry for entry in directory if entry["name"] == name]
+            if not matches:
+                matches = [entry for entry in directory if os.path.basename(entry["name"]) == name]
+            if len(matches) != 1:
+                raise KeyError(name)
+            return MFCC._read_entry(f, matches[0])
+    
+    @staticmethod
+    def _safe_join(output_dir: str, name: str) -> str:
+        """Путь для извлечения записи, не выходящий за output_dir"""
+        relative = os.path.normpath(name)
+        if os.path.isabs(relative) or relative == '..' or relative.startswith('..' + os.sep):
+            raise ValueError(f"Недопустимый путь в архиве: {name}")
+        return os.path.join(output_dir, relative)
+    
+    # === ОПРЕДЕЛЕНИЕ ФОРМАТА ===
+    @staticmethod
+    def _read_header(f) -> Union[Dict, None]:
+        """
+        Читает заголовок формата из начала файла (текстового или бинарного)
+        
+        Returns:
+            JSON заголовок split архива, {"format": NOSPLIT_FORMAT} для строки
+            NOSPLIT_MAGIC или None для старых файлов без заголовка; в этом
+            случае позиция f возвращается в начало
+        """
+        line = f.readline(HEADER_MAX_LEN)
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        if line == NOSPLIT_MAGIC:
+            return {"format": NOSPLIT_FORMAT}
+        if line.startswith(SPLIT_HEADER_PREFIX):
+            return json.loads(line)
+        f.seek(0)
+        return None
+    
+    @staticmethod
+    def detect_mode(path: str) -> str:
+        """
+        Определяет режим файла ('split' или 'nosplit') по первым байтам
+        
+        Файлы с заголовком определяются по полю format. У старых файлов без
+        заголовка распаковывается только короткий префикс: split архив
+        начинается с JSON метаданных.
+        """
+        with open(path, 'rb') as f:
+            header = MFCC._read_header(f)
+            if header is not None:
+                return "split" if header["format"] == SPLIT_FORMAT else "nosplit"
+            prefix = f.read(HEADER_MAX_LEN).decode('ascii', errors='ignore')
+        
+        return "split" if MFCC.decode_nosplit(prefix).startswith(LEGACY_SPLIT_PREFIX) else "nosplit"
+    
+    # === АНАЛИЗ БЕЗ РАСПАКОВКИ ===
+    @staticmethod
+    def _iter_rle_pieces(f) -> Iterator[bytes]:
+        """
+        Читает RLE текст кусками по SCAN_CHUNK_SIZE, не разрезая токены XX|Y|
+        
+        Токены не могут перекрываться (в XX|Y| на месте HEX цифр нет '|'), поэтому
+        достаточно не резать токен, начавшийся в последних 8 символах куска.
+        """
+        carry = b""
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            if not chunk:
+                if carry:
+                    yield carry
+                return
             
-            compressed = MFCC.encode_nosplit(data)
+            buf = carry + chunk
+            cut = max(len(buf) - 4, 0)
+            match = _TOKEN_RE.search(buf, max(cut - 4, 0))
+            if match and match.start() < cut < match.end():
+                cut = match.start()
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(compressed)
+            yield buf[:cut]
+            carry = buf[cut:]
+    
+    @staticmethod
+    def _scan_stats(f) -> Dict:
+        """
+        Потоковая статистика RLE текста с текущей позиции f (бинарный режим)
+        
+        Returns:
+            chars, pipes и decoded_size - размер исходных данных в байтах
+        """
+        stats = {"chars": 0, "pipes": 0}
+        hex_chars = tokens = 0
+        counts = Counter()
+        for piece in MFCC._iter_rle_pieces(f):
+            stats["chars"] += len(piece)
+            stats["pipes"] += piece.count(b'|')
+            hex_chars += len(piece) - len(piece.translate(None, _HEX_CHARS))
+            found = _TOKEN_COUNT_RE.findall(piece)
+            tokens += len(found)
+            counts.update(found)
+        
+        # Каждый токен XX|Y| содержит 3 HEX символа и раскрывается в int(XX) символов
+        decoded_hex = hex_chars - 3 * tokens + sum(int(count, 16) * n for count, n in counts.items())
+        stats["decoded_size"] = (decoded_hex + 1) // 2
+        return stats
+    
+    @staticmethod
+    def _read_legacy_split_metadata(f) -> Dict:
+        """
+        Распаковывает только начало старого split архива - блок metadata,
+        который json.dumps пишет перед содержимым файлов
+        """
+        decoded = bytearray()
+        odd = b""
+        for piece in MFCC._iter_rle_pieces(f):
+            hex_piece = _TOKEN_RE.sub(lambda m: m.group(2) * int(m.group(1), 16), piece)
+            hex_piece = odd + hex_piece.translate(None, _NON_HEX_CHARS)
+            even = len(hex_piece) - len(hex_piece) % 2
+            decoded += bytes.fromhex(hex_piece[:even].decode('ascii'))
+            odd = hex_piece[even:]
+            
+            end = decoded.find(LEGACY_SPLIT_CONTENT)
+            if end != -1:
+                return json.loads(bytes(decoded[:end]) + b'\n  }\n}')["metadata"]
+        
+        raise ValueError("Не найден блок metadata")
+    
+    # === FILE OPERATIONS ===
+    @staticmethod
+    def encode_file_nosplit(input_path: str, output_path: str) -> bool:
+        """Сжимает один файл в режиме nosplit (потоково, блоками по STREAM_BLOCK_SIZE)"""
+        try:
+            with open(input_path, 'rb') as src, open(output_path, 'wb') as f:
+                encoder = MFCC.encode_stream(src, f)
             
-            orig_size = len(data)
-            comp_size = len(compressed)
+            orig_size = encoder.bytes_in
+            comp_size = encoder.chars_out
             ratio = (1 - comp_size / (orig_size * 2)) * 100
             
             print(f"✅ Nosplit: {input_path} → {output_path}")
@@ -161,38 +711,89 @@ class MFCC:
             return False
     
     @staticmethod
-    def encode_file_split(input_paths: List[str], output_path: str) -> bool:
+    def _temp_path(path: str) -> str:
+        """Имя временного файла рядом с path (для атомарной подмены через os.replace)"""
+        return os.path.join(os.path.dirname(os.path.abspath(path)), f".mfcc-{os.urandom(8).hex()}")
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _atomic_output(output_path: str, mode: str = 'wb'):
+        """
+        Открывает временный файл и после успешной записи переименовывает его в output_path
+        
+        При ошибке временный файл удаляется, а старый output_path остается как был.
+        """
+        tmp = MFCC._temp_path(output_path)
+        try:
+            with open(tmp, mode) as f:
+                yield f
+            os.replace(tmp, output_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+    
+    @staticmethod
+    def encode_stream(src, dst) -> "MFCCEncoder":
+        """
+        Сжимает бинарный поток src в nosplit формат в dst (например, stdin → stdout)
+        
+        Читает блоками по STREAM_BLOCK_SIZE. Вывод начинается строкой
+        NOSPLIT_MAGIC, которую старые декодеры пропускают.
+        """
+        dst.write(NOSPLIT_MAGIC)
+        
+        encoder = MFCCEncoder()
+        for block in iter(lambda: src.read(STREAM_BLOCK_SIZE), b""):
+            dst.write(encoder.feed(block).encode('ascii'))
+        dst.write(encoder.flush().encode('ascii'))
+        dst.flush()
+        return encoder
+    
+    @staticmethod
+    def decode_stream(src, dst) -> "MFCCDecoder":
+        """
+        Распаковывает nosplit поток src в dst (перемотка не нужна, подходит stdin)
+        
+        Split архивы требуют произвольного доступа и здесь не поддерживаются.
+        """
+        line = src.readline(HEADER_MAX_LEN)
+        head = b""
+        if line.startswith(SPLIT_HEADER_PREFIX):
+            raise ValueError("Split архив нельзя распаковать из потока")
+        if line != NOSPLIT_MAGIC:
+            # Старый файл без заголовка: прочитанное - уже данные
+            head = line
+            if MFCC.decode_nosplit(head.decode('ascii', errors='ignore')).startswith(LEGACY_SPLIT_PREFIX):
+                raise ValueError("Split архив нельзя распаковать из потока")
+        
+        decoder = MFCCDecoder()
+        dst.write(decoder.feed(head))
+        for block in iter(lambda: src.read(STREAM_BLOCK_SIZE), b""):
+            dst.write(decoder.feed(block))
+        dst.write(decoder.flush())
+        dst.flush()
+        return decoder
+    
+    @staticmethod
+    def encode_file_split(input_paths: List[str], output_path: str, max_workers: int = 4) -> bool:
         """Создает архив из нескольких файлов/папок в режиме split"""
         try:
-            files_data = {}
+            # Файлы сжимаются по мере обхода, без сбора в память
+            directory = MFCC._write_split_archive(MFCC._iter_split_inputs(input_paths), output_path,
+                                                  max_workers)
             
-            # Собираем все файлы
-            for path in input_paths:
-                if os.path.isfile(path):
-                    with open(path, 'rb') as f:
-                        files_data[path] = f.read()
-                elif os.path.isdir(path):
-                    for root, dirs, files in os.walk(path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            with open(file_path, 'rb') as f:
-                                # Сохраняем относительный путь
-                                rel_path = os.path.relpath(file_path, os.path.dirname(path))
-                                files_data[rel_path] = f.read()
-            
-            if not files_data:
+            if not directory:
+                os.remove(output_path)
                 print("❌ Нет файлов для архивации")
                 return False
             
-            # Создаем архив
-            compressed_archive = MFCC.encode_split(files_data)
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(compressed_archive)
-            
-            total_size = sum(len(data) for data in files_data.values())
-            print(f"✅ Split: {len(files_data)} файлов → {output_path}")
+            total_size = sum(entry["original_size"] for entry in directory)
+            blobs = len({entry["offset"] for entry in directory})
+            print(f"✅ Split: {len(directory)} файлов → {output_path}")
             print(f"📊 Общий размер: {total_size} байт")
+            if blobs < len(directory):
+                print(f"♻️  Дубликатов: {len(directory) - blobs} (уникальных блобов: {blobs})")
             return True
             
         except Exception as e:
@@ -200,16 +801,99 @@ class MFCC:
             return False
     
     @staticmethod
-    def decode_file_nosplit(input_path: str, output_path: str) -> bool:
-        """Распаковывает nosplit файл"""
+    def _same_content(entry: Dict, file_path: str) -> bool:
+        """Сравнивает файл с записью каталога по хешу (или crc32 у старых записей)"""
+        if "blake2b" in entry:
+            return MFCC._hash_file(file_path) == entry["blake2b"]
+        crc = 0
+        with open(file_path, 'rb') as src:
+            while True:
+                block = src.read(SPLIT_BLOCK_SIZE)
+                if not block:
+                    break
+                crc = zlib.crc32(block, crc)
+        return crc == entry["crc32"]
+    
+    @staticmethod
+    def update_file_split(archive_path: str, input_paths: List[str], max_workers: int = 4) -> bool:
+        """
+        Добавляет новые и измененные файлы в конец существующего split архива
+        
+        Файл считается неизменным, если совпадают размер и mtime с записью каталога;
+        при другом mtime содержимое сравнивается по хешу. Новые блобы дописываются
+        в конец архива, после старого трейлера, и сбрасываются на диск, а обновленный
+        каталог и трейлер пишутся последними. Пока их нет, файл кончается не трейлером,
+        и читатели (в том числе параллельные extract_one/decode_file_split) находят
+        старый трейлер поиском с конца, поэтому прерванное обновление (даже kill или
+        сбой питания) оставляет архив в прежнем состоянии. При исключении дописанное
+        обрезается. Записи, которых нет среди input_paths, остаются в архиве.
+        """
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                compressed_data = f.read()
+            if not MFCC.is_split_archive(archive_path):
+                print(f"❌ Не индексированный split архив: {archive_path}")
+                return False
             
-            decoded_data = MFCC.decode_nosplit(compressed_data)
+            with open(archive_path, 'r+b') as f:
+                directory = MFCC._read_directory(f)
+                original_size = f.seek(0, os.SEEK_END)
+                positions = {entry["name"]: i for i, entry in enumerate(directory)}
+                blobs = {entry["blake2b"]: entry for entry in directory if "blake2b" in entry}
+                unchanged = 0
+                touched = False  # у неизмененного файла обновился mtime в каталоге
+                
+                def changed_inputs():
+                    nonlocal unchanged, touched
+                    for name, file_path in MFCC._iter_split_inputs(input_paths):
+                        if name in positions:
+                            entry = directory[positions[name]]
+                            st = os.stat(file_path)
+                            if st.st_size == entry["original_size"]:
+                                if entry.get("mtime") == st.st_mtime_ns:
+                                    unchanged += 1
+                                    continue
+                                if MFCC._same_content(entry, file_path):
+                                    entry["mtime"] = st.st_mtime_ns
+                                    touched = True
+                                    unchanged += 1
+                                    continue
+                        yield name, file_path
+                
+                try:
+                    written = MFCC._write_split_blobs(f, changed_inputs(), blobs, max_workers)
+                    
+                    added = 0
+                    for entry in written:
+                        if entry["name"] in positions:
+                            directory[positions[entry["name"]]] = entry
+                        else:
+                            positions[entry["name"]] = len(directory)
+                            directory.append(entry)
+                            added += 1
+                    
+                    if written or touched:
+                        # Блобы - на диск до трейлера, который на них ссылается
+                        f.flush()
+                        os.fsync(f.fileno())
+                        MFCC._write_split_directory(f, directory)
+                except BaseException:
+                    # Откат: старые каталог и трейлер не тронуты, убираем дописанное
+                    f.truncate(original_size)
+                    raise
             
-            with open(output_path, 'wb') as f:
-                f.write(decoded_data)
+            print(f"✅ Split обновлен: {archive_path}")
+            print(f"📊 Новых: {added}, измененных: {len(written) - added}, без изменений: {unchanged}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Ошибка обновления split: {e}")
+            return False
+    
+    @staticmethod
+    def decode_file_nosplit(input_path: str, output_path: str) -> bool:
+        """Распаковывает nosplit файл (потоково, блоками по STREAM_BLOCK_SIZE)"""
+        try:
+            with open(input_path, 'rb') as src, open(output_path, 'wb') as f:
+                MFCC.decode_stream(src, f)
             
             print(f"✅ Nosplit распакован: {input_path} → {output_path}")
             return True
@@ -219,9 +903,13 @@ class MFCC:
             return False
     
     @staticmethod
-    def decode_file_split(input_path: str, output_dir: str) -> bool:
+    def decode_file_split(input_path: str, output_dir: str, max_workers: int = 4) -> bool:
         """Распаковывает split архив"""
         try:
+            if MFCC.is_split_archive(input_path):
+                return MFCC._decode_indexed_split(input_path, output_dir, max_workers)
+            
+            # Старый формат: JSON внутри RLE
             with open(input_path, 'r', encoding='utf-8') as f:
                 compressed_archive = f.read()
             
@@ -250,32 +938,180 @@ class MFCC:
             print(f"❌ Ошибка распаковки split: {e}")
             return False
     
+    @staticmethod
+    def _decode_indexed_split(input_path: str, output_dir: str, max_workers: int = 1) -> bool:
+        """
+        Распаковывает индексированный split архив
+        
+        При max_workers > 1 записи распаковываются пачками в пуле процессов.
+        Папки создаются в основном процессе, пока воркеры пишут предыдущие пачки,
+        а сообщения выводятся в порядке каталога.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
+        with open(input_path, 'rb') as f:
+            directory = MFCC._read_directory(f)
+        
+        if max_workers <= 1:
+            with open(input_path, 'rb') as f:
+                for entry in directory:
+                    file_path = MFCC._safe_join(output_dir, entry["name"])
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    
+                    with open(file_path, 'wb') as out:
+                        out.write(MFCC._read_entry(f, entry))
+                    
+                    print(f"📁 Извлечен: {entry['name']}")
+        else:
+            created_dirs = set()
+            
+            def tasks():
+                batches = MFCC._batch_split_items(directory, lambda entry: entry["original_size"])
+                for batch in batches:
+                    targets = []
+                    for entry in batch:
+                        file_path = MFCC._safe_join(output_dir, entry["name"])
+                        parent = os.path.dirname(file_path)
+                        if parent not in created_dirs:
+                            os.makedirs(parent, exist_ok=True)
+                            created_dirs.add(parent)
+                        targets.append((entry, file_path))
+                    yield input_path, targets
+            
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                for names in MFCC._imap_ordered(pool, MFCC._extract_split_batch,
+                                                tasks(), 2 * max_workers):
+                    for name in names:
+                        print(f"📁 Извлечен: {name}")
+        
+        print(f"✅ Split распакован: {input_path} → {output_dir}")
+        print(f"📊 Извлечено файлов: {len(directory)}")
+        return True
+    
     @staticmethod
     def analyze_file(file_path: str):
-        """Анализирует MFCC файл и определяет режим"""
+        """
+        Анализирует MFCC файл без распаковки: список файлов split архива берется
+        из каталога, размер и статистика nosplit - потоковым проходом по токенам
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
             print(f"🔍 Анализ MFCC файла: {file_path}")
-            print(f"📊 Размер: {len(content)} символов")
+            print(f"📊 Размер: {os.path.getsize(file_path)} байт")
             
-            # Пробуем определить режим
-            try:
-                # Пробуем распаковать как split архив
-                files_data = MFCC.decode_split(content)
-                print("🎯 Режим: SPLIT (архив)")
-                print(f"📁 Файлов в архиве: {len(files_data)}")
-                for name, data in files_data.items():
-                    print(f"   📄 {name}: {len(data)} байт")
-                    
-            except:
-                # Если не split, то nosplit
-                print("🎯 Режим: NOSPLIT (один файл)")
-                decoded_size = len(MFCC.decode_nosplit(content))
-                print(f"📄 Размер файла: {decoded_size} байт")
+            if MFCC.is_split_archive(file_path):
+                directory = MFCC.read_split_directory(file_path)
+                blobs = {entry["offset"]: entry["compressed_size"] for entry in directory}
+                print("🎯 Режим: SPLIT (индексированный архив)")
+                print(f"📁 Файлов в архиве: {len(directory)}")
+                print(f"♻️  Уникальных блобов: {len(blobs)}")
+                print(f"📦 Исходный размер: {sum(entry['original_size'] for entry in directory)} байт")
+                print(f"🔰 Сжатые блобы: {sum(blobs.values())} символов")
+                for entry in directory:
+                    print(f"   📄 {entry['name']}: {entry['original_size']} байт")
+                return
+            
+            mode = MFCC.detect_mode(file_path)
+            with open(file_path, 'rb') as f:
+                MFCC._read_header(f)  # пропускает строку NOSPLIT_MAGIC
+                
+                if mode == "split":
+                    metadata = MFCC._read_legacy_split_metadata(f)
+                    print("🎯 Режим: SPLIT (архив)")
+                    print(f"📁 Файлов в архиве: {metadata['file_count']}")
+                    for name, info in metadata["files"].items():
+                        print(f"   📄 {name}: {info['original_size']} байт")
+                    return
+                
+                stats = MFCC._scan_stats(f)
             
-            print(f"🔢 RLE блоков: {content.count('|') // 2}")
+            print("🎯 Режим: NOSPLIT (один файл)")
+            print(f"📄 Размер файла: {stats['decoded_size']} байт")
+            print(f"🔢 RLE блоков: {stats['pipes'] // 2}")
             
         except Exception as e:
             print(f"❌ Ошибка анализа: {e}")
+
+
+class MFCCEncoder:
+    """
+    Инкрементальный nosplit кодер: куски данных любого размера в feed(), в конце flush()
+    
+    Незакрытая серия в конце куска переносится в следующий, поэтому склеенный
+    вывод feed() и flush() совпадает с MFCC.encode_nosplit от всех данных сразу.
+    """
+    
+    def __init__(self):
+        self._carry = ""  # HEX символы незакрытой серии
+        self.bytes_in = 0
+        self.chars_out = 0
+    
+    def feed(self, data: Union[bytes, str]) -> str:
+        """Кодирует очередной кусок; возвращает готовую часть вывода (может быть пустой)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bytes_in += len(data)
+        
+        hex_str = self._carry + data.hex().upper()
+        self._carry = ""
+        if hex_str:
+            # Серия режется на куски по MAX_RUN от своего начала: полные куски
+            # выдаем сразу, остаток может продолжиться в следующем куске
+            tail = (len(hex_str) - len(hex_str.rstrip(hex_str[-1]))) % MAX_RUN
+            if tail:
+                hex_str, self._carry = hex_str[:-tail], hex_str[-tail:]
+        return self._output(MFCC._encode_hex(hex_str))
+    
+    def flush(self) -> str:
+        """Дописывает перенесенную серию; после flush() кодер можно использовать заново"""
+        hex_str, self._carry = self._carry, ""
+        return self._output(MFCC._encode_hex(hex_str))
+    
+    def _output(self, encoded: str) -> str:
+        self.chars_out += len(encoded)
+        return encoded
+
+
+class MFCCDecoder:
+    """
+    Инкрементальный nosplit декодер: текст любыми кусками в feed(), в конце flush()
+    
+    Токен XX|Y|, разрезанный границей куска, и непарная HEX цифра переносятся
+    в следующий кусок, поэтому склеенный вывод совпадает с MFCC.decode_nosplit.
+    """
+    
+    def __init__(self):
+        self._carry = b""  # конец текста, где может начинаться незаконченный токен
+        self._nibble = b""  # непарная HEX цифра
+        self.chars_in = 0
+        self.bytes_out = 0
+    
+    def feed(self, text: Union[bytes, str]) -> bytes:
+        """Декодирует очередной кусок; возвращает готовые байты (может быть пусто)"""
+        if isinstance(text, str):
+            text = text.encode('utf-8')
+        self.chars_in += len(text)
+        
+        # Как в MFCC._iter_rle_pieces: не режем токен в последних 8 символах
+        buf = self._carry + text
+        cut = max(len(buf) - 4, 0)
+        match = _TOKEN_RE.search(buf, max(cut - 4, 0))
+        if match and match.start() < cut < match.end():
+            cut = match.start()
+        self._carry = buf[cut:]
+        
+        hex_chars = self._nibble + MFCC._expand_hex(buf[:cut])
+        even = len(hex_chars) - len(hex_chars) % 2
+        self._nibble = hex_chars[even:]
+        return self._output(bytes.fromhex(hex_chars[:even].decode('ascii')))
+    
+    def flush(self) -> bytes:
+        """Разбирает остаток; непарная цифра дополняется '0', как в decode_nosplit"""
+        hex_chars = self._nibble + MFCC._expand_hex(self._carry)
+        self._carry = self._nibble = b""
+        if len(hex_chars) % 2 != 0:
+            hex_chars += b'0'
+        return self._output(bytes.fromhex(hex_chars.decode('ascii')))
+    
+    def _output(self, data: bytes) -> bytes:
+        self.bytes_out += len(data)
+        return data
@@ -6,10 +6,17 @@ MFCC Compressor с двумя режимами: split и nosplit
 import os
 import sys
 import argparse
+import contextlib
 from MFCC import MFCC
 
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
 def compress_nosplit(input_path, output_path=None):
     """Режим nosplit: один файл → один .mfcc"""
+    if STDIO in (input_path, output_path):
+        return compress_stream(input_path, output_path)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -20,7 +27,30 @@ def compress_nosplit(input_path, output_path=None):
     print(f"🎯 Режим NOSPLIT: {input_path}")
     return MFCC.encode_file_nosplit(input_path, output_path)
 
-def compress_split(input_paths, output_path=None):
+def compress_stream(input_path, output_path=None):
+    """
+    Потоковый nosplit, '-' - stdin/stdout (например, tar cf - . | compressor.py - | ssh ...)
+    
+    Данные читаются блоками; файл -o подменяется только после успешной записи.
+    """
+    if output_path is None:
+        output_path = STDIO if input_path == STDIO else input_path + '.mfcc'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            encoder = MFCC.encode_stream(src, dst)
+    except Exception as e:
+        print(f"❌ Ошибка потокового сжатия: {e}")
+        return False
+    
+    print(f"✅ Nosplit (поток): {encoder.bytes_in} байт → {encoder.chars_out} символов")
+    return True
+
+def compress_split(input_paths, output_path=None, threads=4, update=False):
     """Режим split: несколько файлов → один .mfcc архив"""
     if output_path is None:
         if len(input_paths) == 1 and os.path.isfile(input_paths[0]):
@@ -28,8 +58,12 @@ def compress_split(input_paths, output_path=None):
         else:
             output_path = 'archive.mfcc'
     
+    if update and os.path.exists(output_path):
+        print(f"🎯 Режим SPLIT (обновление): {len(input_paths)} объектов → {output_path}")
+        return MFCC.update_file_split(output_path, input_paths, max_workers=threads)
+    
     print(f"🎯 Режим SPLIT: {len(input_paths)} объектов → {output_path}")
-    return MFCC.encode_file_split(input_paths, output_path)
+    return MFCC.encode_file_split(input_paths, output_path, max_workers=threads)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -41,30 +75,46 @@ def main():
 NOSPLIT режим (один файл):
   python compressor.py file.txt                    # Сжать файл
   python compressor.py image.jpg -m nosplit        # Явно указать режим
+  tar cf - dir | python compressor.py - | ssh host 'cat > dir.tar.mfcc'  # stdin → stdout
 
 SPLIT режим (архивация):
   python compressor.py folder -m split            # Архивировать папку
   python compressor.py file1.txt file2.jpg -m split # Архивировать файлы
   python compressor.py . -m split -o my_archive.mfcc # Текущая папка в архив
+  python compressor.py folder -m split -u -o a.mfcc  # Дописать новые/измененные файлы
         '''
     )
     
-    parser.add_argument('inputs', nargs='+', help='Файлы или папки для сжатия')
+    parser.add_argument('inputs', nargs='+', help="Файлы или папки для сжатия ('-' - stdin)")
     parser.add_argument('-m', '--mode', choices=['split', 'nosplit'], 
                        help='Режим работы: split (архив) или nosplit (один файл)')
-    parser.add_argument('-o', '--output', help='Выходной файл')
+    parser.add_argument('-o', '--output', help="Выходной файл ('-' - stdout, только nosplit)")
     parser.add_argument('-r', '--recursive', action='store_true',
                        help='Рекурсивная обработка папок (только для split)')
+    parser.add_argument('-t', '--threads', type=int, default=4,
+                       help='Количество процессов для split (по умолчанию: 4)')
+    parser.add_argument('-u', '--update', action='store_true',
+                       help='Дописать новые и измененные файлы в существующий архив (только для split)')
     
     args = parser.parse_args()
     
+    # Когда сжатые данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.inputs == [STDIO] and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        ok = run(args)
+    
+    if not ok:
+        sys.exit(1)
+
+def run(args):
+    """Выполняет разобранные аргументы командной строки"""
     print("🎉 === MFCC Compressor ===")
     print("🚀 Два режима: SPLIT (архив) и NOSPLIT (один файл)")
     print("=" * 60)
     
     # Автоопределение режима если не указан
     if args.mode is None:
-        if len(args.inputs) == 1 and os.path.isfile(args.inputs[0]):
+        if args.inputs == [STDIO] or (len(args.inputs) == 1 and os.path.isfile(args.inputs[0])):
             args.mode = 'nosplit'
         else:
             args.mode = 'split'
@@ -74,11 +124,15 @@ SPLIT режим (архивация):
     if args.mode == 'nosplit':
         if len(args.inputs) > 1:
             print("❌ Nosplit режим работает только с одним файлом!")
-            return
+            return False
         
-        compress_nosplit(args.inputs[0], args.output)
+        return compress_nosplit(args.inputs[0], args.output)
     
     else:  # split mode
+        if STDIO in args.inputs or args.output == STDIO:
+            print("❌ Split архив нельзя читать из stdin или писать в stdout!")
+            return False
+        
         # Проверяем что все пути существуют
         valid_paths = []
         for path in args.inputs:
@@ -88,9 +142,10 @@ SPLIT режим (архивация):
                 print(f"⚠️  Путь не существует: {path}")
         
         if valid_paths:
-            compress_split(valid_paths, args.output)
-        else:
-            print("❌ Нет валидных путей для архивации!")
+            return compress_split(valid_paths, args.output, args.threads, args.update)
+        
+        print("❌ Нет валидных путей для архивации!")
+        return False
 
 if __name__ == "__main__":
     main()
@@ -4,11 +4,22 @@ MFCC Opener с поддержкой двух режимов
 """
 
 import os
+import sys
 import argparse
+import contextlib
 from MFCC import MFCC
 
-def decompress_file(input_path, output_path=None, mode=None):
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
+def decompress_file(input_path, output_path=None, mode=None, threads=4):
     """Распаковывает MFCC файл с автоопределением режима"""
+    if STDIO in (input_path, output_path):
+        if mode == 'split':
+            print("❌ Split архив нельзя читать из stdin или писать в stdout!")
+            return False
+        return decompress_stream(input_path, output_path)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -16,15 +27,8 @@ def decompress_file(input_path, output_path=None, mode=None):
     # Автоопределение режима
     if mode is None:
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Пробуем определить по содержимому
-            try:
-                MFCC.decode_split(content)
-                mode = 'split'
-            except:
-                mode = 'nosplit'
+            # Достаточно заголовка (или короткого префикса у старых файлов)
+            mode = MFCC.detect_mode(input_path)
             
             print(f"🔍 Автоопределен режим: {mode}")
             
@@ -51,7 +55,35 @@ def decompress_file(input_path, output_path=None, mode=None):
                 output_path = 'extracted_files'
         
         print(f"🎯 Распаковка SPLIT: {input_path} → {output_path}")
-        return MFCC.decode_file_split(input_path, output_path)
+        return MFCC.decode_file_split(input_path, output_path, max_workers=threads)
+
+def decompress_stream(input_path, output_path=None):
+    """
+    Потоковый nosplit, '-' - stdin/stdout (например, ssh host cat a.mfcc | open.py - | tar xf -)
+    
+    Данные читаются блоками; файл -o подменяется только после успешной записи.
+    """
+    if output_path is None:
+        if input_path == STDIO:
+            output_path = STDIO
+        elif input_path.endswith('.mfcc'):
+            output_path = input_path[:-5]
+        else:
+            output_path = input_path + '.decompressed'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            decoder = MFCC.decode_stream(src, dst)
+    except Exception as e:
+        print(f"❌ Ошибка потоковой распаковки: {e}")
+        return False
+    
+    print(f"✅ Nosplit распакован (поток): {decoder.bytes_out} байт")
+    return True
 
 def main():
     parser = argparse.ArgumentParser(
@@ -62,27 +94,36 @@ def main():
   python open.py archive.mfcc -m split        # Явно указать режим
   python open.py file.mfcc -o output.txt      # Указать выходной файл
   python open.py file.mfcc -a                 # Анализ без распаковки
+  cat file.mfcc | python open.py - | less      # stdin → stdout
         '''
     )
     
-    parser.add_argument('input', help='MFCC файл для распаковки')
-    parser.add_argument('-o', '--output', help='Выходной файл или папка')
+    parser.add_argument('input', help="MFCC файл для распаковки ('-' - stdin, только nosplit)")
+    parser.add_argument('-o', '--output', help="Выходной файл или папка ('-' - stdout, только nosplit)")
     parser.add_argument('-m', '--mode', choices=['split', 'nosplit'],
                        help='Явное указание режима')
     parser.add_argument('-a', '--analyze', action='store_true',
                        help='Анализ файла без распаковки')
+    parser.add_argument('-t', '--threads', type=int, default=4,
+                       help='Количество процессов для split (по умолчанию: 4)')
     
     args = parser.parse_args()
     
-    print("🎉 === MFCC File Opener ===")
-    print("🚀 Два режима: SPLIT (архив) и NOSPLIT (один файл)")
-    print("=" * 60)
-    
-    if args.analyze:
-        MFCC.analyze_file(args.input)
-        return
+    # Когда распакованные данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.input == STDIO and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        print("🎉 === MFCC File Opener ===")
+        print("🚀 Два режима: SPLIT (архив) и NOSPLIT (один файл)")
+        print("=" * 60)
+        
+        if args.analyze:
+            MFCC.analyze_file(args.input)
+            return
+        
+        ok = decompress_file(args.input, args.output, args.mode, args.threads)
     
-    decompress_file(args.input, args.output, args.mode)
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,101 @@
 import os
-import json
+import re
+import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Union, List, Dict
+import json
+import mmap
+import stat
+import shutil
+import hashlib
+import time
+import bisect
+import functools
+import contextlib
+import binascii
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Union, List, Dict, Optional, Callable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен - без него работает чистый Python
+    np = None
+
+# Размер блока (в байтах) для векторизованного RLE: ограничивает память под индексы
+NUMPY_BLOCK_SIZE = 1024 * 1024
+# Если в блоке меньше одной серии на столько HEX символов, токены вставляются
+# копированием отрезков между сериями, а не через маски (см. _encode_block_numpy)
+SPARSE_RUN_SPACING = 1024
+# Потоковые nosplit файлы читаются блоками такого размера (MFCCEncoder/MFCCDecoder)
+STREAM_BLOCK_SIZE = 1024 * 1024
+MAX_RUN = 255
+# Ширина поля смещения строки в индексе MFCC_PARALLEL
+OFFSET_WIDTH = 20
+PARALLEL_PREFIX = b'{"format": "MFCC_PARALLEL"'
+# Размер чанка MFCC_PARALLEL по умолчанию и для MP4
+PARALLEL_CHUNK_SIZE = 10 * 1024 * 1024
+MP4_CHUNK_SIZE = 5 * 1024 * 1024
+# Воркеров по умолчанию; для MP4 меньше - для стабильности
+DEFAULT_MAX_WORKERS = 4
+MP4_MAX_WORKERS = 2
+# Режимы RLE строк MFCC_PARALLEL: по HEX символам (исходный) и по байтам
+RLE_MODES = ("nibble", "byte")
+# Тег строки чанка, сохраненного без RLE (простой HEX). Не HEX цифра, поэтому
+# старый nibble декодер пропускает его и все равно читает чанк правильно.
+STORED_TAG = "S"
+
+# Бинарный контейнер MFCC-BIN
+BIN_MAGIC = b"MFCC-BIN"
+BIN_VERSION = 1
+BIN_BLOCK_SIZE = 4 * 1024 * 1024
+BIN_MIN_RUN = 4  # более короткие серии дешевле хранить литералами
+BIN_FLAG_STORED = 0x01  # данные записаны как есть, без RLE
+
+# Выборочная оценка сжимаемости для стратегии "sample"
+SAMPLE_COUNT = 16
+SAMPLE_SIZE = 64 * 1024
+STORE_THRESHOLD = 0.95  # если RLE экономит меньше 5%, храним как есть
+PARALLEL_THRESHOLD = 32 * 1024 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Кэш результатов encode_file_cached: каталог по умолчанию, предел размера,
+# версия ключа (менять при изменении формата вывода)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mfcc")
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+CACHE_VERSION = 1
+CACHE_HASH_BLOCK = 1024 * 1024
+# Временные файлы кэша старше этого (секунды) считаются брошенными
+CACHE_STALE_TMP = 3600
+# Вытеснение освобождает кэш до этой доли предела, чтобы следующие записи
+# не обходили весь каталог снова
+CACHE_EVICT_TARGET = 0.9
+# Оценка размера кэша в этом процессе: каталог -> байт (см. MFCC.cache_store)
+_cache_sizes = {}
+
+# Общий пул процессов asyncio API (создается при первом обращении)
+ASYNC_MAX_WORKERS = os.cpu_count() or 1
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+if np is not None:
+    _HEX_DIGITS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+    # Байт -> два HEX символа в верхнем регистре (порядок байт в памяти как в тексте)
+    _HEX_PAIRS = np.frombuffer(bytes(range(256)).hex().upper().encode('ascii'), dtype=np.uint16)
+_PIPE = ord('|')
+
+# Токен серии XX|Y| и все, что не является HEX цифрой
+_TOKEN_RE = re.compile(r'([0-9A-F]{2})\|([0-9A-F])\|')
+_NON_HEX_RE = re.compile(r'[^0-9A-F]+')
+# То же для байтов (инкрементальный декодер)
+_TOKEN_BYTES_RE = re.compile(rb'([0-9A-F]{2})\|([0-9A-F])\|')
+_NON_HEX_CHARS = bytes(c for c in range(256) if c not in b'0123456789ABCDEF')
+# Серия из >= BIN_MIN_RUN одинаковых байт
+_BYTE_RUN_RE = re.compile(rb'(.)\1{3,}', re.DOTALL)
+
+# Исходный файл, отображенный в процессе-воркере: (path, view, ExitStack) (см. MFCC._init_source_worker)
+_worker_source = None
 
 class MFCC:
     """
@@ -11,12 +104,28 @@ class MFCC:
     
     # === БАЗОВЫЕ ФУНКЦИИ ===
     @staticmethod
-    def encode_nosplit(data: Union[bytes, str]) -> str:
-        """Сжимает данные используя RLE с разделителями"""
+    def encode_nosplit(data: Union[bytes, str, memoryview]) -> str:
+        """
+        Сжимает данные используя RLE с разделителями
+        
+        Принимает str, bytes или любой объект с буферным протоколом
+        (memoryview, mmap) - такие данные не копируются.
+        """
         if isinstance(data, str):
             data = data.encode('utf-8')
         
-        hex_str = data.hex().upper()
+        if np is not None:
+            return MFCC._encode_nosplit_numpy(data).decode('ascii')
+        return MFCC._encode_nosplit_python(data)
+    
+    @staticmethod
+    def _encode_nosplit_python(data: bytes) -> str:
+        """Посимвольный RLE на чистом Python (запасной вариант без NumPy)"""
+        return MFCC._encode_hex_python(memoryview(data).hex().upper())
+    
+    @staticmethod
+    def _encode_hex_python(hex_str: str) -> str:
+        """RLE строки HEX символов (верхний регистр)"""
         if not hex_str:
             return ""
         
@@ -25,7 +134,7 @@ class MFCC:
         current_char = hex_str[0]
         
         for i in range(1, len(hex_str)):
-            if hex_str[i] == current_char and count < 255:
+            if hex_str[i] == current_char and count < MAX_RUN:
                 count += 1
             else:
                 if count > 3:
@@ -42,36 +151,221 @@ class MFCC:
             
         return "".join(encoded)
     
+    @staticmethod
+    def _encode_nosplit_numpy(data: bytes) -> bytes:
+        """Векторизованный RLE на NumPy, результат идентичен _encode_nosplit_python (ASCII байты)"""
+        encoded, _ = MFCC._encode_blocks(memoryview(data).cast('B'), b"", final=True)
+        return encoded
+    
+    @staticmethod
+    def _encode_blocks(view: memoryview, carry: bytes, final: bool):
+        """
+        Кодирует байты view блоками по NUMPY_BLOCK_SIZE после HEX символов carry
+        
+        Returns:
+            (закодированные ASCII байты, хвост незакрытой серии; при final пустой)
+        """
+        parts = []
+        for pos in range(0, view.nbytes, NUMPY_BLOCK_SIZE):
+            chars = MFCC._hex_upper(carry, view[pos:pos + NUMPY_BLOCK_SIZE])
+            last = final and pos + NUMPY_BLOCK_SIZE >= view.nbytes
+            encoded, carry = MFCC._encode_hex_block(chars, last)
+            parts.append(encoded)
+        if final and carry:
+            encoded, carry = MFCC._encode_hex_block(carry, True)
+            parts.append(encoded)
+        return b"".join(parts), carry
+    
+    @staticmethod
+    def _hex_upper(carry: bytes, block: memoryview):
+        """HEX символы (верхний регистр) блока после carry; под NumPy - массив uint8"""
+        if np is None:
+            return carry + binascii.hexlify(block).upper()
+        # Пары символов берутся из таблицы сразу в верхнем регистре, без hexlify + upper.
+        # Отступ в байт при нечетном carry выравнивает пары, а mode='clip' (индексы
+        # uint8 всегда в таблице) убирает проверку границ: иначе take вдвое медленнее.
+        pad = len(carry) % 2
+        chars = np.empty(pad + len(carry) + 2 * block.nbytes, dtype=np.uint8)[pad:]
+        chars[:len(carry)] = np.frombuffer(carry, dtype=np.uint8)
+        np.take(_HEX_PAIRS, np.frombuffer(block, dtype=np.uint8), mode='clip',
+                out=chars[len(carry):].view(np.uint16))
+        return chars
+    
+    @staticmethod
+    def _encode_block_numpy(chars, final: bool):
+        """
+        Кодирует блок HEX символов (uint8 ASCII, регистр не важен)
+        
+        Returns:
+            (закодированные байты - bytes или массив uint8, хвост для следующего блока)
+        """
+        n = chars.size
+        if n < 4:
+            if final:
+                return chars, b""
+            return b"", chars.tobytes()
+        
+        run_start, run_len = MFCC._find_runs_numpy(chars)
+        
+        carry = b""
+        if not final:
+            # Последняя серия может продолжиться в следующем блоке. Серия режется
+            # на куски по MAX_RUN от своего начала, поэтому полные куски можно
+            # выдать сразу, а остаток переносим дальше.
+            open_run = bool(run_start.size) and run_start[-1] + run_len[-1] == n
+            if open_run:
+                last = int(run_len[-1])
+            else:
+                last = 1
+                while last < 3 and chars[n - 1 - last] == chars[n - 1]:
+                    last += 1
+            tail = last % MAX_RUN
+            if tail:
+                carry = chars[n - tail:].tobytes()
+                n -= tail
+                chars = chars[:n]
+                if open_run:
+                    run_len[-1] -= tail
+                    if not run_len[-1]:
+                        run_start = run_start[:-1]
+                        run_len = run_len[:-1]
+        
+        if not run_start.size:
+            return chars, carry
+        
+        # Делим серии длиннее MAX_RUN на куски по MAX_RUN + остаток
+        if run_len.max() > MAX_RUN:
+            pieces = (run_len + MAX_RUN - 1) // MAX_RUN
+            run_idx = np.repeat(np.arange(run_len.size), pieces)
+            k = np.arange(run_idx.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+            run_start = run_start[run_idx] + k * MAX_RUN
+            run_len = np.minimum(run_len[run_idx] - k * MAX_RUN, MAX_RUN)
+            tokens = run_len > 3  # короткие остатки остаются литералами
+            run_start = run_start[tokens]
+            run_len = run_len[tokens]
+        
+        # Каждая серия превращается в токен XX|Y| из 5 символов
+        if run_start.size * SPARSE_RUN_SPACING < n:
+            out, at = MFCC._splice_sparse_numpy(chars, run_start, run_len, 5)
+        else:
+            out, _, at = MFCC._splice_numpy(chars, run_start, run_len, np.full(run_len.size, 5))
+        out[at] = _HEX_DIGITS[run_len >> 4]
+        out[at + 1] = _HEX_DIGITS[run_len & 0x0F]
+        out[at + 2] = _PIPE
+        out[at + 3] = chars[run_start]
+        out[at + 4] = _PIPE
+        
+        return out, carry
+    
+    @staticmethod
+    def _encode_hex_block(chars: bytes, final: bool):
+        """
+        Кодирует блок HEX символов (ASCII байты или массив uint8, регистр не важен),
+        как _encode_block_numpy
+        
+        Returns:
+            (закодированные байты, хвост незакрытой серии для следующего блока)
+        """
+        if np is not None:
+            return MFCC._encode_block_numpy(np.frombuffer(chars, dtype=np.uint8), final)
+        
+        carry = b""
+        if not final and chars:
+            # Серия режется на куски по MAX_RUN от своего начала: полные куски
+            # выдаем сразу, остаток может продолжиться в следующем блоке
+            run = len(chars) - len(chars.rstrip(chars[-1:]))
+            tail = run % MAX_RUN
+            if tail:
+                chars, carry = chars[:-tail], chars[-tail:]
+        return MFCC._encode_hex_python(chars.decode('ascii').upper()).encode('ascii'), carry
+    
+    @staticmethod
+    def _find_runs_numpy(values):
+        """
+        Находит серии из >= 4 одинаковых элементов (values.size >= 4)
+        
+        Returns:
+            (начала серий, длины серий)
+        """
+        # quad[i] истинно, когда values[i:i+4] одинаковы. Серия длиной >= 4 -
+        # это непрерывный отрезок quad, удлиненный на 3 элемента.
+        eq = values[1:] == values[:-1]
+        quad = np.zeros(eq.size, dtype=bool)  # с ложными краями
+        np.logical_and(eq[:-2], eq[1:-1], out=quad[1:-1])
+        quad[1:-1] &= eq[2:]
+        edges = np.flatnonzero(quad[1:] != quad[:-1])
+        run_start = edges[0::2]
+        return run_start, edges[1::2] - run_start + 3
+    
+    @staticmethod
+    def _splice_numpy(src, starts, in_lengths, out_lengths):
+        """
+        Копирует src, заменяя отрезки [starts[i], starts[i] + in_lengths[i])
+        незаполненными местами длиной out_lengths[i]
+        
+        Returns:
+            (новый массив, маска скопированных позиций, начала замен в новом массиве)
+        """
+        gaps = starts - np.concatenate(([0], (starts + in_lengths)[:-1]))
+        tail = src.size - int(starts[-1] + in_lengths[-1])
+        flags = np.tile(np.array([True, False]), starts.size + 1)[:-1]
+        
+        lengths = np.empty(flags.size, dtype=np.int64)
+        lengths[0:-1:2] = gaps
+        lengths[-1] = tail
+        lengths[1::2] = out_lengths
+        copied = np.repeat(flags, lengths)
+        at = np.cumsum(lengths)[0:-1:2]
+        
+        out = np.empty(copied.size, dtype=src.dtype)
+        lengths[1::2] = in_lengths
+        out[copied] = src[np.repeat(flags, lengths)]
+        return out, copied, at
+    
+    @staticmethod
+    def _splice_sparse_numpy(src, starts, in_lengths, width: int):
+        """
+        _splice_numpy для редких замен одной ширины: копирует отрезки между ними срезами
+        
+        Returns:
+            (новый массив, начала замен в новом массиве)
+        """
+        ends = (starts + in_lengths).tolist()
+        out = np.empty(src.size + int(width * starts.size - in_lengths.sum()), dtype=src.dtype)
+        at = np.empty(starts.size, dtype=np.int64)
+        src_pos = dst = 0
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends)):
+            size = start - src_pos
+            out[dst:dst + size] = src[src_pos:start]
+            at[i] = dst + size
+            dst += size + width
+            src_pos = end
+        out[dst:] = src[src_pos:]
+        return out, at
+    
     @staticmethod
     def decode_nosplit(compressed_data: str) -> bytes:
         """Восстанавливает данные из nosplit формата"""
         if not compressed_data:
             return b""
         
+        if np is not None:
+            return MFCC._decode_nosplit_numpy(compressed_data)
+        return MFCC._decode_nosplit_python(compressed_data)
+    
+    @staticmethod
+    def _decode_nosplit_python(compressed_data: str) -> bytes:
+        """Декодирование регулярным выражением (запасной вариант без NumPy)"""
         decoded_hex = []
-        i = 0
+        pos = 0
         
-        while i < len(compressed_data):
-            if (i + 4 <= len(compressed_data) and 
-                compressed_data[i+2] == '|' and 
-                compressed_data[i+4] == '|'):
-                
-                if (compressed_data[i] in '0123456789ABCDEF' and 
-                    compressed_data[i+1] in '0123456789ABCDEF' and
-                    compressed_data[i+3] in '0123456789ABCDEF'):
-                    
-                    try:
-                        count = int(compressed_data[i:i+2], 16)
-                        symbol = compressed_data[i+3]
-                        decoded_hex.append(symbol * count)
-                        i += 5
-                        continue
-                    except ValueError:
-                        pass
-            
-            if compressed_data[i] in '0123456789ABCDEF':
-                decoded_hex.append(compressed_data[i])
-            i += 1
+        # Токены не могут перекрываться, поэтому finditer находит ровно те блоки,
+        # которые нашел бы посимвольный проход слева направо
+        for match in _TOKEN_RE.finditer(compressed_data):
+            decoded_hex.append(_NON_HEX_RE.sub('', compressed_data[pos:match.start()]))
+            decoded_hex.append(match.group(2) * int(match.group(1), 16))
+            pos = match.end()
+        decoded_hex.append(_NON_HEX_RE.sub('', compressed_data[pos:]))
         
         hex_str = "".join(decoded_hex)
         if len(hex_str) % 2 != 0:
@@ -79,237 +373,1974 @@ class MFCC:
         
         return bytes.fromhex(hex_str)
     
+    @staticmethod
+    def _decode_nosplit_numpy(compressed_data: str) -> bytes:
+        """Векторизованное декодирование на NumPy по блокам ASCII буфера"""
+        # 'replace' сохраняет позиции: не-ASCII символ превращается в '?' и пропускается
+        raw = np.frombuffer(compressed_data.encode('ascii', 'replace'), dtype=np.uint8)
+        
+        parts = []
+        carry = b""  # непарная HEX цифра из предыдущего блока
+        skip = 0  # сколько символов блока уже занято токеном из предыдущего блока
+        
+        for pos in range(0, raw.size, NUMPY_BLOCK_SIZE):
+            # +4 символа, чтобы увидеть токен, начинающийся в конце блока
+            window = raw[pos:pos + NUMPY_BLOCK_SIZE + 4]
+            size = min(NUMPY_BLOCK_SIZE, window.size)
+            hex_chars, skip = MFCC._decode_block_numpy(window, size, skip)
+            
+            hex_chars = carry + hex_chars
+            carry = b""
+            if len(hex_chars) % 2 != 0:
+                carry = hex_chars[-1:]
+                hex_chars = hex_chars[:-1]
+            parts.append(binascii.unhexlify(hex_chars))
+        
+        if carry:
+            parts.append(binascii.unhexlify(carry + b'0'))
+        
+        return b"".join(parts)
+    
+    @staticmethod
+    def _expand_hex(text: bytes) -> bytes:
+        """
+        Разворачивает токены текста в HEX символы (прочие символы отбрасываются)
+        
+        Токен не должен быть разрезан концом text - это обеспечивает MFCCDecoder.
+        """
+        if np is None:
+            parts = []
+            pos = 0
+            for match in _TOKEN_BYTES_RE.finditer(text):
+                parts.append(text[pos:match.start()].translate(None, _NON_HEX_CHARS))
+                parts.append(match.group(2) * int(match.group(1), 16))
+                pos = match.end()
+            parts.append(text[pos:].translate(None, _NON_HEX_CHARS))
+            return b"".join(parts)
+        
+        raw = np.frombuffer(text, dtype=np.uint8)
+        parts = []
+        skip = 0
+        for pos in range(0, raw.size, NUMPY_BLOCK_SIZE):
+            window = raw[pos:pos + NUMPY_BLOCK_SIZE + 4]
+            hex_chars, skip = MFCC._decode_block_numpy(window, min(NUMPY_BLOCK_SIZE, window.size), skip)
+            parts.append(hex_chars)
+        return b"".join(parts)
+    
+    @staticmethod
+    def _decode_block_numpy(window, size: int, skip: int):
+        """
+        Разворачивает токены, начинающиеся в window[:size]
+        
+        Returns:
+            (HEX символы блока, сколько символов следующего блока занято токеном)
+        """
+        is_hex = ((window >= 48) & (window <= 57)) | ((window >= 65) & (window <= 70))
+        pipe = window == _PIPE
+        
+        k = max(0, min(size, window.size - 4))
+        tokens = (is_hex[:k] & is_hex[1:k + 1] & pipe[2:k + 2] &
+                  is_hex[3:k + 3] & pipe[4:k + 4])
+        starts = np.flatnonzero(tokens)
+        
+        literal = is_hex
+        literal[:skip] = False
+        if not starts.size:
+            return window[:size][literal[:size]].tobytes(), max(0, skip - size)
+        
+        # Символы токена кроме первого выбрасываем, на месте первого - символ серии
+        for offset in range(1, 5):
+            literal[starts + offset] = False
+        values = window[:size].copy()
+        values[starts] = window[starts + 3]
+        marker = np.zeros(size, dtype=bool)
+        marker[starts] = True
+        
+        kept = literal[:size]
+        compact = values[kept]
+        token_at = np.flatnonzero(marker[kept])
+        
+        high = window[starts].astype(np.int64)
+        low = window[starts + 1].astype(np.int64)
+        counts = (np.where(high > 57, high - 55, high - 48) * 16 +
+                  np.where(low > 57, low - 55, low - 48))
+        
+        out, copied, _ = MFCC._splice_numpy(compact, token_at, np.ones(token_at.size, dtype=np.int64), counts)
+        out[~copied] = np.repeat(compact[token_at], counts)
+        
+        return out.tobytes(), max(0, int(starts[-1]) + 5 - size)
+    
+    # === СОБЫТИЯ И МЕТРИКИ ===
+    @staticmethod
+    def _emit(on_event: Optional[Callable[[Dict], None]], event: str, **fields):
+        """
+        Передает on_event событие - словарь {"event": event, **fields}
+        
+        Библиотека сама ничего не печатает: без on_event события отбрасываются.
+        Поле message (если есть) - готовый текст для человека. События:
+            info, plan   - сообщения о выбранном режиме (plan - с полями plan_encoding)
+            start        - op, input, output, total_chunks, total_bytes, max_workers, executor
+            chunk        - op, index, total_chunks, bytes_in, bytes_out, latency
+                           (секунды в воркере), queue_depth (задач в работе), stored
+            done         - op, output, bytes_in, bytes_out, elapsed; у параллельных
+                           режимов еще chunks, worker_busy и utilization (доля времени
+                           воркеров, занятая сжатием)
+            cache        - hit, key, output (кэш encode_file_cached)
+            error        - op, error, error_type
+        """
+        if on_event is not None:
+            fields["event"] = event
+            on_event(fields)
+    
+    @staticmethod
+    def _emit_error(on_event: Optional[Callable[[Dict], None]], op: str, message: str, error: Exception):
+        """Событие error вместо печати пойманного исключения"""
+        MFCC._emit(on_event, "error", op=op, message=f"❌ {message}: {error}",
+                   error=str(error), error_type=type(error).__name__)
+    
+    @staticmethod
+    def _timed_call(fn, task):
+        """Выполняется в воркере: возвращает (fn(task), время выполнения в секундах)"""
+        start = time.perf_counter()
+        result = fn(task)
+        return result, time.perf_counter() - start
+    
+    @staticmethod
+    def console_reporter(metrics_path: Optional[str] = None, every: int = 10) -> Callable[[Dict], None]:
+        """
+        Обработчик событий для CLI: печатает сообщения, прогресс каждые every
+        чанков и итоговую скорость. При metrics_path каждое событие дописывается
+        в файл JSON строкой (для систем мониторинга).
+        """
+        written = {}
+        
+        def report(event: Dict):
+            if metrics_path is not None:
+                with open(metrics_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            
+            kind = event["event"]
+            if kind == "chunk":
+                written[event["op"]] = written.get(event["op"], 0) + event["bytes_out"]
+                done = event["index"] + 1
+                if done % every == 0:
+                    suffix = f", {written[event['op']]/(1024*1024):.1f} MB" if event["op"] == "decode" else ""
+                    print(f"📊 Прогресс: {done}/{event['total_chunks']} чанков{suffix}")
+                return
+            if kind == "start":
+                written[event["op"]] = 0
+            if "message" in event:
+                print(event["message"])
+            if kind == "done" and "utilization" in event and event["elapsed"]:
+                print(f"⏱️  {event['bytes_in']/event['elapsed']/(1024*1024):.1f} MB/s, "
+                      f"загрузка воркеров {event['utilization']*100:.0f}%")
+        
+        return report
+    
     # === МНОГОПОТОЧНОСТЬ ДЛЯ БОЛЬШИХ ФАЙЛОВ ===
     @staticmethod
-    def encode_large_file_parallel(input_path: str, output_path: str, chunk_size=10*1024*1024, max_workers=4) -> bool:
-        """Многопоточное сжатие больших файлов"""
+    def _resolve_executor(executor: str, max_workers: int, total_chunks: int) -> str:
+        """Заменяет режим auto на process, если есть что распараллелить, иначе на thread"""
+        if executor == "auto":
+            return "process" if max_workers > 1 and total_chunks > 1 else "thread"
+        return executor
+    
+    @staticmethod
+    def _make_executor(executor: str, max_workers: int, total_chunks: int,
+                       initializer: Optional[Callable] = None, initargs: tuple = ()):
+        """
+        Создает пул воркеров
+        
+        Args:
+            executor: "thread", "process" или "auto" (процессы, если есть что распараллелить)
+            initializer: Вызывается с initargs при старте каждого процесса (потокам не передается)
+        """
+        executor = MFCC._resolve_executor(executor, max_workers, total_chunks)
+        if executor == "process":
+            return ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                                       initargs=initargs)
+        if executor == "thread":
+            return ThreadPoolExecutor(max_workers=max_workers)
+        raise ValueError(f"Неизвестный режим исполнителя: {executor}")
+    
+    @staticmethod
+    def _imap_ordered(pool, fn, tasks, max_in_flight: int, with_depth: bool = False):
+        """
+        Отдает результаты fn(task) в порядке задач (буфер переупорядочивания)
+        
+        В работе одновременно не больше max_in_flight задач, поэтому готовые, но еще
+        не записанные результаты не накапливаются в памяти без ограничений.
+        При with_depth отдает пары (результат, сколько задач еще в работе).
+        """
+        pending = deque()
+        try:
+            for task in tasks:
+                if len(pending) >= max_in_flight:
+                    result = pending.popleft().result()
+                    yield (result, len(pending)) if with_depth else result
+                pending.append(pool.submit(fn, task))
+            while pending:
+                result = pending.popleft().result()
+                yield (result, len(pending)) if with_depth else result
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _encode_line(data: bytes, rle: str = "nibble", adaptive: bool = True) -> str:
+        """
+        Сжимает чанк в строку MFCC_PARALLEL
+        
+        Args:
+            rle: "nibble" - токены XX|Y| по HEX символам (счетчик до 255),
+                 "byte" - HEX запись байтового RLE с varint длинами серий
+            adaptive: если RLE вышел длиннее простого HEX, записать чанк как
+                      есть с тегом STORED_TAG
+        """
+        if rle == "nibble":
+            encoded = MFCC.encode_nosplit(data)
+        elif rle == "byte":
+            encoded = binascii.hexlify(MFCC.encode_bytes_rle(data)).upper().decode('ascii')
+        else:
+            raise ValueError(f"Неизвестный режим RLE: {rle}")
+        
+        if adaptive and len(encoded) > 2 * len(data) + len(STORED_TAG):
+            return STORED_TAG + binascii.hexlify(data).upper().decode('ascii')
+        return encoded
+    
+    @staticmethod
+    def _decode_line(line: str, rle: str = "nibble") -> bytes:
+        """Распаковывает строку чанка MFCC_PARALLEL"""
+        if line.startswith(STORED_TAG):
+            return binascii.unhexlify(line[len(STORED_TAG):])
+        if rle == "nibble":
+            return MFCC.decode_nosplit(line)
+        if rle == "byte":
+            return MFCC.decode_bytes_rle(binascii.unhexlify(line))
+        raise ValueError(f"Неизвестный режим RLE: {rle}")
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _map_file(path: str):
+        """Отображает файл в память только для чтения и отдает memoryview на него"""
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                yield memoryview(b"")  # пустой файл нельзя отобразить
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                with memoryview(mapping) as view:
+                    yield view
+    
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        """Имя временного файла рядом с path (для атомарной подмены через os.replace)"""
+        return os.path.join(os.path.dirname(os.path.abspath(path)), f".mfcc-{os.urandom(8).hex()}")
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _atomic_output(output_path: str, mode: str = 'wb', **kwargs):
+        """
+        Открывает временный файл и после успешной записи переименовывает его в output_path
+        
+        Существующий output_path не переписывается на месте: если это жесткая
+        ссылка на запись кэша, ссылка просто разрывается. При ошибке временный
+        файл удаляется, а старый output_path остается как был.
+        """
+        # Не mkstemp: у файла должны быть обычные права (по umask), а не 0600
+        tmp = MFCC._temp_path(output_path)
+        try:
+            with open(tmp, mode, **kwargs) as f:
+                yield f
+            os.replace(tmp, output_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+    
+    @staticmethod
+    def _init_source_worker(path: str):
+        """Инициализатор процесса: отображает исходный файл один раз на весь срок воркера"""
+        global _worker_source
+        stack = contextlib.ExitStack()
+        _worker_source = (path, stack.enter_context(MFCC._map_file(path)), stack)
+    
+    @staticmethod
+    def _encode_view_chunk(view: memoryview, task, rle: str = "nibble", adaptive: bool = True) -> str:
+        """
+        Воркер: сжимает кусок (offset, length) отображения view
+        
+        Срез освобождается до выхода, в том числе при ошибке: кадры трассировки
+        очищаются от ссылок на него, иначе закрытие отображения упадет с
+        BufferError и скроет настоящую ошибку.
+        """
+        offset, length = task
+        chunk = view[offset:offset + length]
+        try:
+            return MFCC._encode_line(chunk, rle, adaptive)
+        except BaseException as e:
+            traceback.clear_frames(e.__traceback__)
+            raise
+        finally:
+            chunk.release()
+    
+    @staticmethod
+    def _encode_chunk(task, rle: str = "nibble", adaptive: bool = True) -> str:
+        """
+        Воркер процесса: сжимает кусок (path, offset, length) исходного файла
+        
+        Использует отображение из _init_source_worker, а в общем пуле без
+        инициализатора (asyncio API) отображает файл на время задачи.
+        """
+        path, offset, length = task
+        if _worker_source is not None and _worker_source[0] == path:
+            return MFCC._encode_view_chunk(_worker_source[1], (offset, length), rle, adaptive)
+        with MFCC._map_file(path) as view:
+            return MFCC._encode_view_chunk(view, (offset, length), rle, adaptive)
+    
+    @staticmethod
+    def _decode_chunk(task, rle: str = "nibble") -> bytes:
+        """Воркер: распаковывает строку (path, offset, length) MFCC файла"""
+        path, offset, length = task
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return MFCC._decode_line(f.read(length).decode('utf-8').strip(), rle)
+    
+    @staticmethod
+    def encode_large_file_parallel(input_path: str, output_path: str, chunk_size=PARALLEL_CHUNK_SIZE,
+                                   max_workers=4, executor: str = "auto", max_in_flight=None,
+                                   rle: str = "nibble", adaptive: bool = True,
+                                   on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Многопоточное (или многопроцессное) сжатие больших файлов
+        
+        Чанк N пишется сразу, как только готовы чанки 0..N-1. В памяти одновременно
+        не больше max_in_flight чанков (по умолчанию 2 * max_workers).
+        Режим RLE ("nibble" или "byte") записывается в заголовок. При adaptive
+        каждый чанк, которому RLE не помог, хранится как простой HEX с тегом.
+        on_event получает события start, chunk, done и error (см. MFCC._emit).
+        """
+        if rle not in RLE_MODES:
+            MFCC._emit_error(on_event, "encode", "Ошибка многопоточного сжатия",
+                             ValueError(f"Неизвестный режим RLE: {rle}"))
+            return False
+        if max_in_flight is None:
+            max_in_flight = 2 * max_workers
+        
         try:
+            started = time.perf_counter()
             file_size = os.path.getsize(input_path)
             total_chunks = (file_size + chunk_size - 1) // chunk_size
             
-            print(f"🔧 Многопоточное сжатие: {file_size/(1024*1024):.1f} MB")
-            print(f"📦 Чанков: {total_chunks}, Потоков: {max_workers}")
+            # Индекс: [смещение строки в .mfcc, смещение в оригинале, длина в оригинале]
+            index = [[0, i * chunk_size, min(chunk_size, file_size - i * chunk_size)]
+                     for i in range(total_chunks)]
             
-            results = []
-            lock = threading.Lock()
+            mode = MFCC._resolve_executor(executor, max_workers, total_chunks)
+            MFCC._emit(on_event, "start", op="encode", input=input_path, output=output_path,
+                       total_chunks=total_chunks, total_bytes=file_size,
+                       max_workers=max_workers, executor=mode,
+                       message=f"🔧 Многопоточное сжатие: {file_size/(1024*1024):.1f} MB\n"
+                               f"📦 Чанков: {total_chunks}, Потоков: {max_workers}")
             
-            def process_chunk(chunk_id, start_pos, chunk_size):
-                try:
-                    with open(input_path, 'rb') as f:
-                        f.seek(start_pos)
-                        chunk_data = f.read(chunk_size)
-                    
-                    compressed = MFCC.encode_nosplit(chunk_data)
-                    
-                    with lock:
-                        results.append((chunk_id, compressed))
-                    
-                    return True
-                except Exception as e:
-                    print(f"❌ Ошибка в чанке {chunk_id}: {e}")
-                    return False
-            
-            # Запускаем потоки
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for i in range(total_chunks):
-                    start_pos = i * chunk_size
-                    actual_chunk_size = min(chunk_size, file_size - start_pos)
-                    future = executor.submit(process_chunk, i, start_pos, actual_chunk_size)
-                    futures.append(future)
+            with MFCC._map_file(input_path) as view, \
+                    MFCC._atomic_output(output_path, 'w', encoding='utf-8', newline='\n') as f:
+                if mode == "thread":
+                    # Потоки режут одно отображение файла сами, без копий; в задачах и
+                    # futures нет срезов, которые помешали бы закрыть отображение
+                    tasks = ((start, length) for _, start, length in index)
+                    worker = functools.partial(MFCC._encode_view_chunk, view, rle=rle, adaptive=adaptive)
+                    pool_init = {}
+                else:
+                    # Процессам передаем только координаты чанка; файл каждый воркер
+                    # отображает один раз в инициализаторе
+                    tasks = ((input_path, start, length) for _, start, length in index)
+                    worker = functools.partial(MFCC._encode_chunk, rle=rle, adaptive=adaptive)
+                    pool_init = {"initializer": MFCC._init_source_worker, "initargs": (input_path,)}
                 
-                # Ждем завершения
-                completed = 0
-                for future in as_completed(futures):
-                    completed += 1
-                    if completed % 10 == 0:
-                        print(f"📊 Прогресс: {completed}/{total_chunks} чанков")
-            
-            # Сортируем и сохраняем результаты
-            results.sort(key=lambda x: x[0])
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
                 # Записываем метаданные для многопоточного формата
                 metadata = {
                     "format": "MFCC_PARALLEL",
                     "chunks": total_chunks,
-                    "original_size": file_size
+                    "original_size": file_size,
+                    "chunk_size": chunk_size,
+                    "rle": rle
                 }
-                f.write(json.dumps(metadata) + "\n")
+                header = MFCC._parallel_header(metadata, index)
+                f.write(header)
+                offset = len(header)  # вывод - чистый ASCII, символы == байты
+                stored_chunks = 0
+                busy = 0.0
                 
-                for chunk_id, compressed in results:
-                    f.write(f"{compressed}\n")
+                with MFCC._make_executor(mode, max_workers, total_chunks, **pool_init) as pool:
+                    worker = functools.partial(MFCC._timed_call, worker)
+                    results = MFCC._imap_ordered(pool, worker, tasks, max_in_flight, with_depth=True)
+                    for i, ((compressed, latency), depth) in enumerate(results):
+                        index[i][0] = offset
+                        stored = compressed.startswith(STORED_TAG)
+                        stored_chunks += stored
+                        f.write(compressed)
+                        f.write("\n")
+                        offset += len(compressed) + 1
+                        busy += latency
+                        MFCC._emit(on_event, "chunk", op="encode", index=i, total_chunks=total_chunks,
+                                   bytes_in=index[i][2], bytes_out=len(compressed) + 1,
+                                   latency=latency, queue_depth=depth, stored=stored)
+                
+                # Поля смещений фиксированной ширины - перезаписываем заголовок на месте
+                f.seek(0)
+                f.write(MFCC._parallel_header(metadata, index))
             
-            print(f"✅ Многопоточное сжатие завершено: {output_path}")
+            elapsed = time.perf_counter() - started
+            message = f"✅ Многопоточное сжатие завершено: {output_path}"
+            if stored_chunks:
+                message = f"📦 Чанков без RLE: {stored_chunks}/{total_chunks}\n" + message
+            MFCC._emit(on_event, "done", op="encode", output=output_path, chunks=total_chunks,
+                       bytes_in=file_size, bytes_out=offset, elapsed=elapsed, worker_busy=busy,
+                       utilization=busy / (elapsed * max_workers) if elapsed else 0.0,
+                       stored_chunks=stored_chunks, message=message)
             return True
             
         except Exception as e:
-            print(f"❌ Ошибка многопоточного сжатия: {e}")
+            MFCC._emit_error(on_event, "encode", "Ошибка многопоточного сжатия", e)
             return False
     
     @staticmethod
-    def decode_large_file_parallel(input_path: str, output_path: str, max_workers=4) -> bool:
-        """Многопоточная распаковка больших файлов"""
+    def _parallel_header(metadata: dict, index: List[List[int]]) -> str:
+        """
+        Строка метаданных MFCC_PARALLEL с индексом чанков
+        
+        Смещения строк дополняются пробелами до фиксированной ширины, поэтому
+        заголовок можно записать заранее и перезаписать после сжатия.
+        """
+        entries = ", ".join(f"[{line_offset:{OFFSET_WIDTH}d}, {start}, {length}]"
+                            for line_offset, start, length in index)
+        return json.dumps(metadata)[:-1] + f', "index": [{entries}]}}\n'
+    
+    @staticmethod
+    def _indexed_line_tasks(input_path: str, index: List[List[int]]):
+        """Задачи (path, offset, length) для строк чанков по индексу из заголовка"""
+        ends = [entry[0] for entry in index[1:]] + [os.path.getsize(input_path)]
+        return [(input_path, entry[0], end - entry[0]) for entry, end in zip(index, ends)]
+    
+    @staticmethod
+    def _chunk_line_tasks(input_path: str, f, total_chunks: int):
+        """Лениво отдает задачи (path, offset, length) для строк чанков после метаданных"""
+        offset = f.tell()
+        count = 0
+        for line in f:
+            count += 1
+            if count > total_chunks:
+                raise ValueError("Несоответствие количества чанков")
+            yield (input_path, offset, len(line))
+            offset += len(line)
+        if count != total_chunks:
+            raise ValueError("Несоответствие количества чанков")
+    
+    @staticmethod
+    def decode_large_file_parallel(input_path: str, output_path: str, max_workers=4,
+                                   executor: str = "auto", max_in_flight=None,
+                                   progress: Optional[Callable[[int, int], None]] = None,
+                                   on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Многопоточная (или многопроцессная) распаковка больших файлов
+        
+        Строки чанков читаются лениво, в памяти не больше max_in_flight чанков
+        (по умолчанию 2 * max_workers). progress(записано_байт, всего_байт)
+        вызывается после записи каждого чанка. on_event получает события
+        start, chunk, done и error (см. MFCC._emit).
+        """
+        if max_in_flight is None:
+            max_in_flight = 2 * max_workers
+        
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            if not lines or len(lines) < 2:
-                print("❌ Неверный формат многопоточного файла")
-                return False
-            
-            # Читаем метаданные
-            metadata = json.loads(lines[0].strip())
-            total_chunks = metadata["chunks"]
-            
-            print(f"🔧 Многопоточная распаковка: {total_chunks} чанков")
+            started = time.perf_counter()
+            with open(input_path, 'rb') as src, MFCC._atomic_output(output_path) as f:
+                # Читаем метаданные
+                try:
+                    metadata = json.loads(src.readline().decode('utf-8'))
+                    total_chunks = metadata["chunks"]
+                except (ValueError, KeyError, TypeError):
+                    MFCC._emit_error(on_event, "decode", "Ошибка многопоточной распаковки",
+                                     ValueError("Неверный формат многопоточного файла"))
+                    return False
+                total_size = metadata.get("original_size", 0)
+                rle = metadata.get("rle", "nibble")  # старые файлы - только nibble
+                
+                MFCC._emit(on_event, "start", op="decode", input=input_path, output=output_path,
+                           total_chunks=total_chunks, total_bytes=total_size, max_workers=max_workers,
+                           executor=MFCC._resolve_executor(executor, max_workers, total_chunks),
+                           message=f"🔧 Многопоточная распаковка: {total_chunks} чанков")
+                
+                if "index" in metadata:
+                    tasks = MFCC._indexed_line_tasks(input_path, metadata["index"])
+                    if len(tasks) != total_chunks:
+                        raise ValueError("Несоответствие количества чанков")
+                else:
+                    tasks = MFCC._chunk_line_tasks(input_path, src, total_chunks)
+                written = 0
+                busy = 0.0
+                line_lengths = deque()  # длины отправленных строк, по порядку результатов
+                
+                def submitted(tasks):
+                    for task in tasks:
+                        line_lengths.append(task[2])
+                        yield task
+                
+                with MFCC._make_executor(executor, max_workers, total_chunks) as pool:
+                    worker = functools.partial(MFCC._timed_call, functools.partial(MFCC._decode_chunk, rle=rle))
+                    results = MFCC._imap_ordered(pool, worker, submitted(tasks), max_in_flight,
+                                                 with_depth=True)
+                    for i, ((data, latency), depth) in enumerate(results):
+                        f.write(data)
+                        written += len(data)
+                        busy += latency
+                        if progress is not None:
+                            progress(written, total_size)
+                        MFCC._emit(on_event, "chunk", op="decode", index=i, total_chunks=total_chunks,
+                                   bytes_in=line_lengths.popleft(), bytes_out=len(data),
+                                   latency=latency, queue_depth=depth)
             
-            if len(lines) != total_chunks + 1:
-                print("❌ Несоответствие количества чанков")
-                return False
+            elapsed = time.perf_counter() - started
+            MFCC._emit(on_event, "done", op="decode", output=output_path, chunks=total_chunks,
+                       bytes_in=os.path.getsize(input_path), bytes_out=written, elapsed=elapsed, worker_busy=busy,
+                       utilization=busy / (elapsed * max_workers) if elapsed else 0.0,
+                       message=f"✅ Многопоточная распаковка завершена: {output_path}")
+            return True
             
-            results = []
-            lock = threading.Lock()
+        except Exception as e:
+            MFCC._emit_error(on_event, "decode", "Ошибка многопоточной распаковки", e)
+            return False
+    
+    @staticmethod
+    def read_range(path: str, start: int, length: int) -> bytes:
+        """
+        Возвращает байты [start, start + length) оригинального файла
+        
+        Для MFCC_PARALLEL с индексом распаковываются только чанки, пересекающие
+        диапазон. Старые файлы без индекса и MFCC-BIN распаковываются
+        последовательно до конца диапазона (MFCC-BIN без RLE читается сразу
+        с нужного места), nosplit - целиком.
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Диапазон не может быть отрицательным")
+        end = start + length
+        
+        with open(path, 'rb') as f:
+            if f.read(len(BIN_MAGIC)) == BIN_MAGIC:
+                f.seek(0)
+                return MFCC._read_range_bin(f, start, end)
+            f.seek(0)
+            first_line = f.readline()
+            if not first_line.startswith(b'{"format": "MFCC_PARALLEL"'):
+                return MFCC.decode_nosplit(first_line.decode('utf-8') + f.read().decode('utf-8'))[start:end]
+            metadata = json.loads(first_line.decode('utf-8'))
+            rle = metadata.get("rle", "nibble")
             
-            def process_chunk(chunk_id, compressed_data):
-                try:
-                    decoded = MFCC.decode_nosplit(compressed_data)
-                    
-                    with lock:
-                        results.append((chunk_id, decoded))
-                    
-                    return True
-                except Exception as e:
-                    print(f"❌ Ошибка распаковки чанка {chunk_id}: {e}")
-                    return False
+            if "index" not in metadata:
+                parts = []
+                position = 0
+                for line in f:
+                    if position >= end:
+                        break
+                    data = MFCC._decode_line(line.decode('utf-8').strip(), rle)
+                    if position + len(data) > start:
+                        parts.append(data[max(0, start - position):end - position])
+                    position += len(data)
+                return b"".join(parts)
             
-            # Запускаем потоки для распаковки
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for i in range(1, len(lines)):  # Пропускаем метаданные
-                    future = executor.submit(process_chunk, i-1, lines[i].strip())
-                    futures.append(future)
-                
-                completed = 0
-                for future in as_completed(futures):
-                    completed += 1
-                    if completed % 10 == 0:
-                        print(f"📊 Прогресс: {completed}/{total_chunks} чанков")
+            index = metadata["index"]
+            tasks = MFCC._indexed_line_tasks(path, index)
+            first = max(bisect.bisect_right([entry[1] for entry in index], start) - 1, 0)
             
-            # Сортируем и собираем данные
-            results.sort(key=lambda x: x[0])
+            parts = []
+            for i in range(first, len(index)):
+                chunk_start = index[i][1]
+                if chunk_start >= end:
+                    break
+                _, line_offset, line_length = tasks[i]
+                f.seek(line_offset)
+                data = MFCC._decode_line(f.read(line_length).decode('utf-8').strip(), rle)
+                parts.append(data[max(0, start - chunk_start):end - chunk_start])
+            return b"".join(parts)
+    
+    @staticmethod
+    def _read_range_bin(f, start: int, end: int) -> bytes:
+        """Байты [start, end) из открытого файла MFCC-BIN"""
+        original_size, stored, buffer = MFCC._read_bin_header(f)
+        end = min(end, original_size)
+        if start >= end:
+            return b""
+        if stored:
+            f.seek(f.tell() - len(buffer) + start)
+            data = f.read(end - start)
+            if len(data) != end - start:
+                raise ValueError("Поврежденные данные: размер не совпадает")
+            return data
+        
+        f.seek(0)
+        parts = []
+        position = 0
+        for decoded in MFCC._iter_decode_bin(f):
+            if position + len(decoded) > start:
+                parts.append(decoded[max(0, start - position):end - position])
+            position += len(decoded)
+            if position >= end:
+                break
+        return b"".join(parts)
+    
+    # === БИНАРНЫЙ КОНТЕЙНЕР MFCC-BIN ===
+    # Формат: MAGIC, версия (1 байт), флаги (1 байт), varint исходного размера,
+    # затем записи. Заголовок записи - varint (длина << 1 | признак серии):
+    # серия - один байт значения, литерал - длина байт как есть.
+    @staticmethod
+    def _write_varint(out: bytearray, value: int):
+        """Дописывает беззнаковый LEB128 varint"""
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    
+    @staticmethod
+    def _read_varint(data, pos: int):
+        """
+        Читает varint с позиции pos
+        
+        Returns:
+            (значение, позиция после varint) или (None, pos), если данных не хватает
+        """
+        value = 0
+        shift = 0
+        start = pos
+        while pos < len(data):
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+        return None, start
+    
+    @staticmethod
+    def _byte_runs(data) -> List[tuple]:
+        """Серии из >= BIN_MIN_RUN одинаковых байт: [(начало, длина), ...]"""
+        if np is not None:
+            values = np.frombuffer(data, dtype=np.uint8)
+            if values.size < BIN_MIN_RUN:
+                return []
+            run_start, run_len = MFCC._find_runs_numpy(values)
+            return list(zip(run_start.tolist(), run_len.tolist()))
+        return [(m.start(), m.end() - m.start()) for m in _BYTE_RUN_RE.finditer(data)]
+    
+    @staticmethod
+    def encode_bytes_rle(data: bytes) -> bytes:
+        """Байтовый RLE: серии (varint длина, байт) и литеральные блоки"""
+        data = memoryview(data).cast('B')
+        out = bytearray()
+        prev = 0
+        
+        for start, length in MFCC._byte_runs(data):
+            if start > prev:
+                MFCC._write_varint(out, (start - prev) << 1)
+                out += data[prev:start]
+            MFCC._write_varint(out, (length << 1) | 1)
+            out.append(data[start])
+            prev = start + length
+        
+        if prev < len(data):
+            MFCC._write_varint(out, (len(data) - prev) << 1)
+            out += data[prev:]
+        
+        return bytes(out)
+    
+    @staticmethod
+    def _decode_bytes_rle_prefix(data, pos: int = 0):
+        """
+        Распаковывает все полные записи начиная с pos
+        
+        Returns:
+            (распакованные байты, позиция первой неполной записи)
+        """
+        parts = []
+        while pos < len(data):
+            header, body = MFCC._read_varint(data, pos)
+            if header is None:
+                break
+            length = header >> 1
+            if header & 1:
+                if body >= len(data):
+                    break
+                parts.append(bytes((data[body],)) * length)
+                pos = body + 1
+            else:
+                if body + length > len(data):
+                    break
+                parts.append(bytes(data[body:body + length]))
+                pos = body + length
+        return b"".join(parts), pos
+    
+    @staticmethod
+    def decode_bytes_rle(data: bytes) -> bytes:
+        """Восстанавливает данные из байтового RLE"""
+        decoded, pos = MFCC._decode_bytes_rle_prefix(data)
+        if pos != len(data):
+            raise ValueError("Поврежденные данные: обрезанная запись RLE")
+        return decoded
+    
+    @staticmethod
+    def _bin_header(original_size: int, stored: bool = False) -> bytearray:
+        """Заголовок MFCC-BIN: MAGIC, версия, флаги и varint исходного размера"""
+        header = bytearray(BIN_MAGIC)
+        header += bytes((BIN_VERSION, BIN_FLAG_STORED if stored else 0))
+        MFCC._write_varint(header, original_size)
+        return header
+    
+    @staticmethod
+    def _encode_bin_chunk(task, stored: bool = False) -> bytes:
+        """Воркер: блок (path, offset, length) исходного файла в записи MFCC-BIN"""
+        path, offset, length = task
+        with MFCC._map_file(path) as view:
+            block = bytes(view[offset:offset + length])
+        return block if stored else MFCC.encode_bytes_rle(block)
+    
+    @staticmethod
+    def is_bin_file(path: str) -> bool:
+        """Проверяет сигнатуру MFCC-BIN"""
+        with open(path, 'rb') as f:
+            return f.read(len(BIN_MAGIC)) == BIN_MAGIC
+    
+    @staticmethod
+    def encode_file_bin(input_path: str, output_path: str, stored: bool = False,
+                        on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Сжатие в бинарный контейнер MFCC-BIN блоками по BIN_BLOCK_SIZE
+        
+        Args:
+            stored: записать данные как есть (флаг BIN_FLAG_STORED), без RLE
+            on_event: получает события done и error (см. MFCC._emit)
+        """
+        try:
+            started = time.perf_counter()
+            file_size = os.path.getsize(input_path)
+            header = MFCC._bin_header(file_size, stored)
             
-            with open(output_path, 'wb') as f:
-                for chunk_id, data in results:
-                    f.write(data)
+            written = len(header)
+            with open(input_path, 'rb') as src, MFCC._atomic_output(output_path) as f:
+                f.write(header)
+                while True:
+                    block = src.read(BIN_BLOCK_SIZE)
+                    if not block:
+                        break
+                    encoded = block if stored else MFCC.encode_bytes_rle(block)
+                    f.write(encoded)
+                    written += len(encoded)
             
-            print(f"✅ Многопоточная распаковка завершена: {output_path}")
+            ratio = (1 - written / file_size) * 100 if file_size else 0.0
+            MFCC._emit(on_event, "done", op="encode", output=output_path, bytes_in=file_size,
+                       bytes_out=written, elapsed=time.perf_counter() - started,
+                       message=f"✅ MFCC-BIN: {input_path} → {output_path}\n"
+                               f"📊 Эффективность: {ratio:.1f}%")
             return True
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка сжатия MFCC-BIN", e)
+            return False
+    
+    @staticmethod
+    def decode_file_bin(input_path: str, output_path: str,
+                        on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """Распаковка MFCC-BIN потоком, без загрузки всего файла"""
+        try:
+            started = time.perf_counter()
+            with open(input_path, 'rb') as src, MFCC._atomic_output(output_path) as f:
+                written = MFCC._decode_bin_stream(src, f)
             
+            MFCC._emit(on_event, "done", op="decode", output=output_path,
+                       bytes_in=os.path.getsize(input_path), bytes_out=written,
+                       elapsed=time.perf_counter() - started,
+                       message=f"✅ Распаковка MFCC-BIN завершена: {input_path} → {output_path}")
+            return True
         except Exception as e:
-            print(f"❌ Ошибка многопоточной распаковки: {e}")
+            MFCC._emit_error(on_event, "decode", "Ошибка распаковки MFCC-BIN", e)
             return False
     
+    @staticmethod
+    def _decode_bin_stream(src, dst, head: bytes = b"") -> int:
+        """
+        Распаковывает MFCC-BIN из src в dst (бинарные потоки, в т.ч. каналы)
+        
+        Args:
+            head: Уже прочитанное начало src
+            
+        Returns:
+            Сколько байт записано
+        """
+        written = 0
+        for decoded in MFCC._iter_decode_bin(src, head):
+            dst.write(decoded)
+            written += len(decoded)
+        return written
+    
+    @staticmethod
+    def _read_bin_header(src, head: bytes = b""):
+        """
+        Читает заголовок MFCC-BIN
+        
+        Returns:
+            (исходный размер, флаг stored, прочитанные байты после заголовка)
+        """
+        head += src.read(max(0, len(BIN_MAGIC) + 2 + 10 - len(head)))
+        if head[:len(BIN_MAGIC)] != BIN_MAGIC:
+            raise ValueError("Нет сигнатуры MFCC-BIN")
+        version, flags = head[len(BIN_MAGIC)], head[len(BIN_MAGIC) + 1]
+        if version > BIN_VERSION:
+            raise ValueError(f"Неподдерживаемая версия MFCC-BIN: {version}")
+        original_size, pos = MFCC._read_varint(head, len(BIN_MAGIC) + 2)
+        if original_size is None:
+            raise ValueError("Поврежденный заголовок MFCC-BIN")
+        return original_size, bool(flags & BIN_FLAG_STORED), head[pos:]
+    
+    @staticmethod
+    def _iter_decode_bin(src, head: bytes = b""):
+        """
+        Распаковывает MFCC-BIN из src по блокам
+        
+        Yields:
+            Распакованные куски; размер сверяется с заголовком после последнего
+        """
+        original_size, stored, buffer = MFCC._read_bin_header(src, head)
+        written = 0
+        while True:
+            block = src.read(BIN_BLOCK_SIZE)
+            buffer += block
+            if stored:
+                decoded, pos = buffer, len(buffer)
+            else:
+                decoded, pos = MFCC._decode_bytes_rle_prefix(buffer)
+            if decoded:
+                yield decoded
+            written += len(decoded)
+            buffer = buffer[pos:]
+            if not block:
+                break
+        
+        if buffer or written != original_size:
+            raise ValueError("Поврежденные данные: размер не совпадает")
+    
     # === СПЕЦИАЛЬНАЯ ОБРАБОТКА MP4 ===
     @staticmethod
-    def encode_mp4(input_path: str, output_path: str) -> bool:
+    def encode_mp4(input_path: str, output_path: str, max_workers=MP4_MAX_WORKERS, executor: str = "auto",
+                   on_event: Optional[Callable[[Dict], None]] = None) -> bool:
         """Специальная обработка MP4 файлов"""
         try:
             file_size = os.path.getsize(input_path)
-            print(f"🎥 Обработка MP4: {file_size/(1024*1024):.1f} MB")
+            MFCC._emit(on_event, "info", message=f"🎥 Обработка MP4: {file_size/(1024*1024):.1f} MB")
             
             # Для MP4 используем многопоточность с оптимизированными параметрами
             return MFCC.encode_large_file_parallel(
                 input_path, 
                 output_path, 
-                chunk_size=5*1024*1024,  # 5MB чанки для MP4
-                max_workers=2  # Меньше потоков для стабильности
+                chunk_size=MP4_CHUNK_SIZE,
+                max_workers=max_workers,  # По умолчанию меньше потоков для стабильности
+                executor=executor,
+                on_event=on_event
             )
         except Exception as e:
-            print(f"❌ Ошибка обработки MP4: {e}")
+            MFCC._emit_error(on_event, "encode", "Ошибка обработки MP4", e)
             return False
     
     @staticmethod
-    def decode_mp4(input_path: str, output_path: str) -> bool:
+    def decode_mp4(input_path: str, output_path: str, max_workers=MP4_MAX_WORKERS, executor: str = "auto",
+                   on_event: Optional[Callable[[Dict], None]] = None) -> bool:
         """Распаковка MP4 файлов"""
         try:
-            return MFCC.decode_large_file_parallel(input_path, output_path, max_workers=2)
+            return MFCC.decode_large_file_parallel(input_path, output_path, max_workers, executor,
+                                                   on_event=on_event)
         except Exception as e:
-            print(f"❌ Ошибка распаковки MP4: {e}")
+            MFCC._emit_error(on_event, "decode", "Ошибка распаковки MP4", e)
             return False
     
     # === АВТОМАТИЧЕСКОЕ ОПРЕДЕЛЕНИЕ РЕЖИМА ===
     @staticmethod
-    def encode_file_auto(input_path: str, output_path: str) -> bool:
-        """Автоматически выбирает оптимальный метод сжатия"""
+    def plan_encoding(input_path: str, container: str = "text", max_workers=4,
+                      samples=SAMPLE_COUNT, sample_size=SAMPLE_SIZE) -> Dict:
+        """
+        Оценивает сжимаемость по выборке из samples блоков и выбирает стратегию
+        
+        Returns:
+            Словарь с решением и его входными данными:
+            decision ("stored", "bin", "nosplit" или "parallel"), container, rle,
+            chunk_size, max_workers, expected_ratio (размер выхода / размер входа),
+            а также file_size, samples, sampled_bytes, run_density,
+            nibble_ratio и byte_ratio по выборке.
+        """
+        file_size = os.path.getsize(input_path)
+        
+        # Равномерно расставленные блоки; маленький файл берем целиком
+        if file_size <= samples * sample_size:
+            offsets = [0] if file_size else []
+            sample_size = file_size
+        else:
+            step = (file_size - sample_size) // (samples - 1) if samples > 1 else 0
+            offsets = [i * step for i in range(samples)]
+        
+        sampled = run_bytes = nibble_bytes = byte_bytes = 0
+        with MFCC._map_file(input_path) as view:
+            for offset in offsets:
+                block = view[offset:offset + sample_size]
+                sampled += len(block)
+                run_bytes += sum(length for _, length in MFCC._byte_runs(block))
+                nibble_bytes += len(MFCC.encode_nosplit(block))
+                byte_bytes += len(MFCC.encode_bytes_rle(block))
+                del block
+        
+        nibble_ratio = nibble_bytes / sampled if sampled else 1.0
+        byte_ratio = byte_bytes / sampled if sampled else 1.0
+        
+        plan = {
+            "file_size": file_size,
+            "samples": len(offsets),
+            "sampled_bytes": sampled,
+            "run_density": run_bytes / sampled if sampled else 0.0,
+            "nibble_ratio": nibble_ratio,
+            "byte_ratio": byte_ratio,
+        }
+        
+        # Лучший вариант RLE для контейнера; в тексте байтовый RLE записан HEX (x2)
+        if container == "bin":
+            rle, expected = "byte", byte_ratio
+        elif nibble_ratio <= 2 * byte_ratio:
+            rle, expected = "nibble", nibble_ratio
+        else:
+            rle, expected = "byte", 2 * byte_ratio
+        
+        if expected >= STORE_THRESHOLD:
+            if byte_ratio < STORE_THRESHOLD:
+                # Текст не окупается (HEX удваивает размер), а байтовый RLE в MFCC-BIN сжимает
+                plan.update(decision="bin", container="bin", rle="byte", expected_ratio=byte_ratio,
+                            chunk_size=None, max_workers=1)
+                return plan
+            # RLE только раздует данные - храним как есть в MFCC-BIN
+            plan.update(decision="stored", container="bin", rle=None, expected_ratio=1.0,
+                        chunk_size=None, max_workers=1)
+            return plan
+        
+        plan.update(container=container, rle=rle, expected_ratio=expected,
+                    chunk_size=None, max_workers=1)
+        if container == "bin":
+            plan["decision"] = "bin"
+        elif rle == "nibble" and file_size <= PARALLEL_THRESHOLD:
+            plan["decision"] = "nosplit"
+        else:
+            # Крупные файлы режем так, чтобы на каждого воркера пришлось ~4 чанка;
+            # байтовый RLE в тексте требует заголовка MFCC_PARALLEL
+            chunk_size = file_size // (4 * max(max_workers, 1))
+            chunk_size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, chunk_size))
+            chunks = max(1, (file_size + chunk_size - 1) // chunk_size)
+            plan.update(decision="parallel", chunk_size=chunk_size,
+                        max_workers=min(max_workers, chunks))
+        return plan
+    
+    @staticmethod
+    def encode_file_auto(input_path: str, output_path: str, max_workers=None, executor: str = "auto",
+                         container: str = "text", rle: str = "nibble", strategy: str = "size",
+                         on_plan: Optional[Callable[[Dict], None]] = None,
+                         on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Автоматически выбирает оптимальный метод сжатия
+        
+        Args:
+            max_workers: Число воркеров; None - по умолчанию для режима
+                         (DEFAULT_MAX_WORKERS, для MP4 - MP4_MAX_WORKERS)
+            container: "text" (HEX текст, как раньше) или "bin" (MFCC-BIN)
+            rle: "nibble" или "byte"; байтовый режим хранится в заголовке,
+                 поэтому текстовый вывод всегда идет в формате MFCC_PARALLEL
+            strategy: "size" - по размеру и расширению, как раньше;
+                      "sample" - по выборке (см. plan_encoding), несжимаемые
+                      данные сохраняются как есть
+            on_plan: получает словарь plan_encoding при strategy="sample"
+            on_event: получает события выбранного режима (см. MFCC._emit)
+        """
+        workers = max_workers if max_workers is not None else DEFAULT_MAX_WORKERS
+        choice = MFCC._choose_encoding(input_path, workers, container, rle, strategy,
+                                       on_plan, on_event)
+        
+        if choice["method"] == "bin":
+            return MFCC.encode_file_bin(input_path, output_path, stored=choice["stored"], on_event=on_event)
+        if choice["method"] == "parallel":
+            return MFCC.encode_large_file_parallel(
+                input_path, output_path, chunk_size=choice["chunk_size"],
+                max_workers=choice["max_workers"], executor=executor, rle=choice["rle"],
+                on_event=on_event)
+        if choice["method"] == "mp4":
+            return MFCC.encode_mp4(input_path, output_path,
+                                   max_workers if max_workers is not None else MP4_MAX_WORKERS,
+                                   executor, on_event=on_event)
+        return MFCC.encode_file_nosplit(input_path, output_path, on_event=on_event)
+    
+    @staticmethod
+    def _choose_encoding(input_path: str, max_workers=4, container: str = "text", rle: str = "nibble",
+                         strategy: str = "size", on_plan: Optional[Callable[[Dict], None]] = None,
+                         on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Выбирает метод сжатия для encode_file_auto и aencode_file
+        
+        Returns:
+            {"method": "bin", "stored"}, {"method": "parallel", "chunk_size",
+            "max_workers", "rle"}, {"method": "mp4"} или {"method": "nosplit"}
+        """
+        if strategy == "sample":
+            plan = MFCC.plan_encoding(input_path, container, max_workers)
+            if on_plan is not None:
+                on_plan(plan)
+            MFCC._emit(on_event, "plan", **plan,
+                       message=f"🧪 Выборка: {plan['samples']} блоков, серии {plan['run_density']*100:.1f}%, "
+                               f"ожидаемый размер {plan['expected_ratio']*100:.0f}% → {plan['decision']}")
+            
+            if plan["decision"] in ("stored", "bin"):
+                return {"method": "bin", "stored": plan["decision"] == "stored"}
+            if plan["decision"] == "parallel":
+                return {"method": "parallel", "chunk_size": plan["chunk_size"],
+                        "max_workers": plan["max_workers"], "rle": plan["rle"]}
+            return {"method": "nosplit"}
+        
+        if container == "bin":
+            MFCC._emit(on_event, "info", message="📦 Используем бинарный контейнер MFCC-BIN")
+            return {"method": "bin", "stored": False}
+        
+        if rle == "byte":
+            MFCC._emit(on_event, "info", message="🧱 Используем байтовый RLE")
+            return {"method": "parallel", "chunk_size": PARALLEL_CHUNK_SIZE,
+                    "max_workers": max_workers, "rle": rle}
+        
         file_size = os.path.getsize(input_path)
         file_ext = os.path.splitext(input_path)[1].lower()
         
         # Большие файлы (>900MB) - многопоточность
         if file_size > 900 * 1024 * 1024:
-            print("🚀 Используем многопоточный режим для большого файла")
-            return MFCC.encode_large_file_parallel(input_path, output_path)
+            MFCC._emit(on_event, "info", message="🚀 Используем многопоточный режим для большого файла")
+            return {"method": "parallel", "chunk_size": PARALLEL_CHUNK_SIZE,
+                    "max_workers": max_workers, "rle": "nibble"}
         
         # MP4 файлы - специальная обработка
         elif file_ext == '.mp4':
-            print("🎥 Используем MP4 режим")
-            return MFCC.encode_mp4(input_path, output_path)
+            MFCC._emit(on_event, "info", message="🎥 Используем MP4 режим")
+            return {"method": "mp4"}
         
         # Обычные файлы - стандартный метод
         else:
-            print("📄 Используем стандартный режим")
-            return MFCC.encode_file_nosplit(input_path, output_path)
+            MFCC._emit(on_event, "info", message="📄 Используем стандартный режим")
+            return {"method": "nosplit"}
     
     @staticmethod
-    def decode_file_auto(input_path: str, output_path: str) -> bool:
+    def decode_file_auto(input_path: str, output_path: str, max_workers=4, executor: str = "auto",
+                         on_event: Optional[Callable[[Dict], None]] = None) -> bool:
         """Автоматически определяет метод распаковки"""
         try:
+            if MFCC.is_bin_file(input_path):
+                return MFCC.decode_file_bin(input_path, output_path, on_event=on_event)
+            
             with open(input_path, 'r', encoding='utf-8') as f:
                 first_line = f.readline().strip()
             
             # Проверяем формат многопоточного файла
             if first_line.startswith('{"format": "MFCC_PARALLEL"'):
-                return MFCC.decode_large_file_parallel(input_path, output_path)
+                return MFCC.decode_large_file_parallel(input_path, output_path, max_workers, executor,
+                                                       on_event=on_event)
             else:
-                return MFCC.decode_file_nosplit(input_path, output_path)
+                return MFCC.decode_file_nosplit(input_path, output_path, on_event=on_event)
                 
         except Exception as e:
-            print(f"❌ Ошибка автоопределения: {e}, используем стандартный метод")
-            return MFCC.decode_file_nosplit(input_path, output_path)
+            MFCC._emit(on_event, "info", message=f"❌ Ошибка автоопределения: {e}, используем стандартный метод")
+            return MFCC.decode_file_nosplit(input_path, output_path, on_event=on_event)
     
     # === СТАНДАРТНЫЕ МЕТОДЫ ===
     @staticmethod
-    def encode_file_nosplit(input_path: str, output_path: str) -> bool:
-        """Стандартное сжатие для маленьких файлов"""
+    def encode_file_nosplit(input_path: str, output_path: str,
+                            on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """Стандартное сжатие: файл кодируется потоково, блоками по STREAM_BLOCK_SIZE"""
         try:
-            with open(input_path, 'rb') as f:
-                data = f.read()
+            started = time.perf_counter()
+            with open(input_path, 'rb') as src, MFCC._atomic_output(output_path) as f:
+                encoder = MFCC._encode_nosplit_stream(src, f)
             
-            compressed = MFCC.encode_nosplit(data)
+            MFCC._emit(on_event, "done", op="encode", output=output_path, bytes_in=encoder.bytes_in,
+                       bytes_out=encoder.chars_out, elapsed=time.perf_counter() - started,
+                       message=f"✅ Сжатие завершено: {input_path} → {output_path}")
+            return True
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка сжатия", e)
+            return False
+    
+    @staticmethod
+    def decode_file_nosplit(input_path: str, output_path: str,
+                            on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """Стандартная распаковка: потоково, блоками по STREAM_BLOCK_SIZE"""
+        try:
+            started = time.perf_counter()
+            with open(input_path, 'rb') as src, MFCC._atomic_output(output_path) as f:
+                decoder = MFCC._decode_nosplit_stream(src, f)
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(compressed)
+            MFCC._emit(on_event, "done", op="decode", output=output_path, bytes_in=decoder.chars_in,
+                       bytes_out=decoder.bytes_out, elapsed=time.perf_counter() - started,
+                       message=f"✅ Распаковка завершена: {input_path} → {output_path}")
+            return True
+        except Exception as e:
+            MFCC._emit_error(on_event, "decode", "Ошибка распаковки", e)
+            return False
+    
+    # === ПОТОКИ (STDIN/STDOUT) ===
+    @staticmethod
+    def _iter_encode_nosplit(src, encoder: "MFCCEncoder"):
+        """Кодирует бинарный поток src блоками по STREAM_BLOCK_SIZE, отдает ASCII куски"""
+        for block in iter(functools.partial(src.read, STREAM_BLOCK_SIZE), b""):
+            yield encoder._feed(block)
+        yield encoder._flush()
+    
+    @staticmethod
+    def _iter_decode_nosplit(src, decoder: "MFCCDecoder", head: bytes = b""):
+        """Декодирует RLE текст из src (после уже прочитанного head), отдает куски байт"""
+        yield decoder.feed(head)
+        for block in iter(functools.partial(src.read, STREAM_BLOCK_SIZE), b""):
+            yield decoder.feed(block)
+        yield decoder.flush()
+    
+    @staticmethod
+    def _encode_nosplit_stream(src, dst) -> "MFCCEncoder":
+        """Кодирует бинарный поток src в dst блоками по STREAM_BLOCK_SIZE"""
+        encoder = MFCCEncoder()
+        for piece in MFCC._iter_encode_nosplit(src, encoder):
+            dst.write(piece)
+        return encoder
+    
+    @staticmethod
+    def _decode_nosplit_stream(src, dst, head: bytes = b"") -> "MFCCDecoder":
+        """Декодирует RLE текст из src (после уже прочитанного head) в dst"""
+        decoder = MFCCDecoder()
+        for piece in MFCC._iter_decode_nosplit(src, decoder, head):
+            dst.write(piece)
+        return decoder
+    
+    @staticmethod
+    def encode_stream(src, dst, container: str = "text",
+                      on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Сжатие из бинарного потока в бинарный поток (например, stdin → stdout)
+        
+        Память ограничена размером блока. Текстовый контейнер - nosplit RLE
+        (режимы с индексом требуют перемотки выхода). MFCC-BIN хранит размер
+        в заголовке, поэтому доступен, только если src - обычный файл.
+        """
+        try:
+            started = time.perf_counter()
+            if container == "bin":
+                st = os.fstat(src.fileno())
+                if not stat.S_ISREG(st.st_mode):
+                    raise ValueError("MFCC-BIN из канала невозможен: размер заранее неизвестен")
+                header = MFCC._bin_header(st.st_size)
+                dst.write(header)
+                bytes_in = 0
+                bytes_out = len(header)
+                for block in iter(functools.partial(src.read, BIN_BLOCK_SIZE), b""):
+                    encoded = MFCC.encode_bytes_rle(block)
+                    dst.write(encoded)
+                    bytes_in += len(block)
+                    bytes_out += len(encoded)
+                if bytes_in != st.st_size:
+                    raise ValueError("Файл изменился во время сжатия")
+            else:
+                encoder = MFCC._encode_nosplit_stream(src, dst)
+                bytes_in, bytes_out = encoder.bytes_in, encoder.chars_out
+            dst.flush()
             
-            print(f"✅ Сжатие завершено: {input_path} → {output_path}")
+            MFCC._emit(on_event, "done", op="encode", output="-", bytes_in=bytes_in,
+                       bytes_out=bytes_out, elapsed=time.perf_counter() - started,
+                       message=f"✅ Потоковое сжатие завершено: {bytes_in} → {bytes_out} байт")
             return True
         except Exception as e:
-            print(f"❌ Ошибка сжатия: {e}")
+            MFCC._emit_error(on_event, "encode", "Ошибка потокового сжатия", e)
             return False
     
     @staticmethod
-    def decode_file_nosplit(input_path: str, output_path: str) -> bool:
-        """Стандартная распаковка"""
+    def decode_stream(src, dst, on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Распаковка из бинарного потока в бинарный поток (например, stdin → stdout)
+        
+        Формат определяется по первым байтам: MFCC-BIN, MFCC_PARALLEL (строки
+        читаются по порядку, без индекса) или nosplit RLE.
+        """
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                compressed_data = f.read()
+            started = time.perf_counter()
+            head = src.read(len(PARALLEL_PREFIX))
+            if head.startswith(BIN_MAGIC):
+                bytes_out = MFCC._decode_bin_stream(src, dst, head)
+            elif head == PARALLEL_PREFIX:
+                metadata = json.loads(head + src.readline())
+                rle = metadata.get("rle", "nibble")
+                bytes_out = 0
+                if rle == "nibble":
+                    # Перевод строки не HEX символ, а чанки - целые байты, поэтому
+                    # строки чанков можно декодировать одним потоком
+                    bytes_out = MFCC._decode_nosplit_stream(src, dst).bytes_out
+                else:
+                    for line in src:
+                        data = MFCC._decode_line(line.decode('ascii').strip(), rle)
+                        dst.write(data)
+                        bytes_out += len(data)
+                if bytes_out != metadata["original_size"]:
+                    raise ValueError("Поврежденные данные: размер не совпадает")
+            else:
+                bytes_out = MFCC._decode_nosplit_stream(src, dst, head).bytes_out
+            dst.flush()
+            
+            MFCC._emit(on_event, "done", op="decode", output="-", bytes_out=bytes_out,
+                       elapsed=time.perf_counter() - started,
+                       message=f"✅ Потоковая распаковка завершена: {bytes_out} байт")
+            return True
+        except Exception as e:
+            MFCC._emit_error(on_event, "decode", "Ошибка потоковой распаковки", e)
+            return False
+    
+    # === КЭШ РЕЗУЛЬТАТОВ ===
+    @staticmethod
+    def cache_key(input_path: str, params: Dict) -> str:
+        """
+        Ключ кэша: BLAKE2b содержимого файла и параметров, влияющих на вывод
+        
+        Файл читается блоками по CACHE_HASH_BLOCK, память не зависит от размера.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True).encode('utf-8'))
+        with open(input_path, 'rb') as f:
+            for block in iter(functools.partial(f.read, CACHE_HASH_BLOCK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _cache_path(cache_dir: str, key: str) -> str:
+        """Путь записи кэша: подкаталог по первым двум символам ключа"""
+        return os.path.join(cache_dir, key[:2], key + ".mfcc")
+    
+    @staticmethod
+    def _replace_from(source: str, output_path: str, link: bool, read_only: bool = False):
+        """
+        Атомарно подменяет output_path копией (или жесткой ссылкой) source
+        
+        Пишет во временный файл рядом с output_path и переименовывает его,
+        поэтому читатели никогда не видят недописанный файл.
+        
+        Args:
+            read_only: Сделать копию доступной только для чтения (записи кэша)
+        """
+        tmp = MFCC._temp_path(output_path)
+        try:
+            if link:
+                try:
+                    os.link(source, tmp)
+                except OSError:  # другая ФС или ссылки не поддерживаются
+                    shutil.copyfile(source, tmp)
+            else:
+                shutil.copyfile(source, tmp)
+                if read_only:
+                    os.chmod(tmp, 0o444)
+            os.replace(tmp, output_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+    
+    @staticmethod
+    def cache_fetch(cache_dir: str, key: str, output_path: str, link: bool = False) -> bool:
+        """
+        Кладет результат из кэша в output_path
+        
+        Args:
+            link: Жесткая ссылка на запись кэша вместо копии. Записи кэша только
+                  для чтения, а все писатели MFCC заменяют выход через os.replace,
+                  поэтому следующая запись в output_path разрывает ссылку, а не
+                  портит запись
+            
+        Returns:
+            True при попадании; False, если записи нет (или ее только что вытеснили)
+        """
+        entry = MFCC._cache_path(cache_dir, key)
+        try:
+            MFCC._replace_from(entry, output_path, link)
+            # Время изменения записи - метка последнего использования для LRU
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    @staticmethod
+    def cache_store(cache_dir: str, key: str, output_path: str, max_bytes: int = CACHE_MAX_BYTES):
+        """
+        Сохраняет output_path в кэш и вытесняет давно неиспользованные записи
+        
+        Запись появляется атомарно (переименованием), поэтому несколько процессов
+        могут одновременно писать и читать один кэш: одинаковый ключ означает
+        одинаковое содержимое, и последний rename просто заменяет запись.
+        
+        Каталог обходится (cache_evict) при первой записи в процессе, а дальше
+        только когда оценка размера превысит max_bytes; до этого к оценке
+        прибавляется размер новой записи. Записи других процессов оценка не
+        видит - их учтет следующий обход.
+        """
+        entry = MFCC._cache_path(cache_dir, key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        # Запись только для чтения: жесткую ссылку на нее не перепишут на месте
+        MFCC._replace_from(output_path, entry, link=False, read_only=True)
+        
+        known = _cache_sizes.get(os.path.abspath(cache_dir))
+        size = os.path.getsize(entry)
+        if known is None or known + size > max_bytes:
+            MFCC.cache_evict(cache_dir, max_bytes)
+        else:
+            _cache_sizes[os.path.abspath(cache_dir)] = known + size
+    
+    @staticmethod
+    def cache_evict(cache_dir: str, max_bytes: int = CACHE_MAX_BYTES) -> int:
+        """
+        Если кэш больше max_bytes, удаляет самые давно использованные записи,
+        пока не останется CACHE_EVICT_TARGET от max_bytes
+        
+        Параллельное вытеснение из нескольких процессов безопасно: уже
+        удаленные файлы пропускаются. Заодно убираются брошенные временные
+        файлы упавших процессов, а оценка размера для cache_store обновляется.
+        
+        Returns:
+            Сколько байт освобождено
+        """
+        entries = []
+        total = 0
+        now = time.time()
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.startswith(".mfcc-"):
+                    if now - st.st_mtime > CACHE_STALE_TMP:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        
+        freed = 0
+        if total > max_bytes:
+            limit = int(max_bytes * CACHE_EVICT_TARGET)
+            for _, size, path in sorted(entries):
+                if total - freed <= limit:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    freed += size
+        _cache_sizes[os.path.abspath(cache_dir)] = total - freed
+        return freed
+    
+    @staticmethod
+    def encode_file_cached(input_path: str, output_path: str, cache_dir: str = CACHE_DIR,
+                           max_bytes: int = CACHE_MAX_BYTES, link: bool = False, max_workers=None,
+                           executor: str = "auto", container: str = "text", rle: str = "nibble",
+                           strategy: str = "size",
+                           on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        encode_file_auto с кэшем результатов на диске
+        
+        Ключ - содержимое файла и параметры, от которых зависит вывод
+        (контейнер, RLE, стратегия, MP4 режим, число воркеров для стратегии
+        sample). При попадании файл только хэшируется, без сжатия.
+        """
+        params = {"container": container, "rle": rle, "strategy": strategy,
+                  "mp4": os.path.splitext(input_path)[1].lower() == '.mp4'}
+        if strategy == "sample":
+            # Размер чанка в плане зависит от числа воркеров
+            params["max_workers"] = max_workers if max_workers is not None else DEFAULT_MAX_WORKERS
+        
+        try:
+            key = MFCC.cache_key(input_path, params)
+            if MFCC.cache_fetch(cache_dir, key, output_path, link):
+                MFCC._emit(on_event, "cache", hit=True, key=key, output=output_path,
+                           message=f"♻️  Из кэша: {input_path} → {output_path}")
+                return True
+            MFCC._emit(on_event, "cache", hit=False, key=key, output=output_path)
+        except OSError as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка кэша", e)
+            return False
+        
+        if not MFCC.encode_file_auto(input_path, output_path, max_workers, executor, container=container,
+                                     rle=rle, strategy=strategy, on_event=on_event):
+            return False
+        
+        try:
+            MFCC.cache_store(cache_dir, key, output_path, max_bytes)
+        except OSError as e:
+            # Результат уже записан - кэш лишь не пополнился
+            MFCC._emit(on_event, "info", message=f"⚠️  Не удалось сохранить в кэш: {e}")
+        return True
+    
+    # === ASYNCIO API ===
+    @staticmethod
+    def get_async_executor():
+        """
+        Общий пул процессов для asyncio API (ASYNC_MAX_WORKERS процессов)
+        
+        Все корутины делят один пул, поэтому сотни одновременных запросов
+        не создают сотни процессов, а встают в общую очередь.
+        """
+        global _async_executor
+        with _async_executor_lock:
+            if _async_executor is None:
+                _async_executor = ProcessPoolExecutor(max_workers=ASYNC_MAX_WORKERS)
+            return _async_executor
+    
+    @staticmethod
+    def set_async_executor(executor):
+        """
+        Подменяет общий пул asyncio API (например, своим пулом нужного размера)
+        
+        Returns:
+            Предыдущий пул или None; завершать его - забота вызывающего
+        """
+        global _async_executor
+        with _async_executor_lock:
+            previous, _async_executor = _async_executor, executor
+        return previous
+    
+    @staticmethod
+    def _call_collecting(fn, *args, **kwargs):
+        """Выполняется в воркере: вызывает fn(..., on_event=...) и возвращает (результат, события)"""
+        events = []
+        return fn(*args, on_event=events.append, **kwargs), events
+    
+    @staticmethod
+    async def _run_collecting(on_event: Optional[Callable[[Dict], None]], fn, *args, **kwargs):
+        """Выполняет fn в общем пуле и передает его события on_event уже в цикле событий"""
+        loop = asyncio.get_running_loop()
+        result, events = await loop.run_in_executor(
+            MFCC.get_async_executor(), functools.partial(MFCC._call_collecting, fn, *args, **kwargs))
+        if on_event is not None:
+            for event in events:
+                on_event(event)
+        return result
+    
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _aopen(path: str, mode: str = 'rb', discard: bool = False, **kwargs):
+        """
+        open() для корутин: файл открывается и закрывается в потоке
+        
+        Args:
+            discard: Удалить файл, если корутину отменили, пока он открывался
+        """
+        loop = asyncio.get_running_loop()
+        opening = loop.run_in_executor(None, functools.partial(open, path, mode, **kwargs))
+        try:
+            f = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # Поток все равно откроет файл - закрываем его, когда откроет
+            opening.add_done_callback(functools.partial(MFCC._close_opened, path if discard else None))
+            raise
+        try:
+            yield f
+        finally:
+            await loop.run_in_executor(None, f.close)
+    
+    @staticmethod
+    def _close_opened(discard_path: Optional[str], future):
+        """Закрывает файл, открытый уже после отмены (см. _aopen)"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        future.result().close()
+        if discard_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(discard_path)
+    
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _aatomic_output(output_path: str, mode: str = 'wb', **kwargs):
+        """
+        Асинхронный аналог _atomic_output: открытие, закрытие и переименование идут в потоке
+        
+        При ошибке или отмене временный файл удаляется, а старый output_path
+        остается как был.
+        """
+        loop = asyncio.get_running_loop()
+        tmp = MFCC._temp_path(output_path)
+        try:
+            async with MFCC._aopen(tmp, mode, discard=True, **kwargs) as f:
+                yield f
+            await loop.run_in_executor(None, os.replace, tmp, output_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+    
+    @staticmethod
+    def _write_next(pieces, dst) -> Optional[int]:
+        """Берет следующий кусок из итератора и пишет его в dst; None - куски кончились"""
+        piece = next(pieces, None)
+        if piece is None:
+            return None
+        dst.write(piece)
+        return len(piece)
+    
+    @staticmethod
+    def _rewrite_start(f, data):
+        """Переписывает начало файла (заголовок того же размера)"""
+        f.seek(0)
+        f.write(data)
+    
+    @staticmethod
+    def _read_head(path: str, size: int) -> bytes:
+        """Первые size байт файла"""
+        with open(path, 'rb') as f:
+            return f.read(size)
+    
+    @staticmethod
+    async def _aimap_ordered(pool, fn, tasks, max_in_flight: int, with_depth: bool = False):
+        """
+        Асинхронный аналог _imap_ordered: результаты fn(task) в порядке задач
+        
+        Новые задачи отправляются в пул, только когда потребитель забирает
+        результаты (обратное давление). При закрытии генератора или отмене
+        ожидающие задачи отменяются.
+        """
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        try:
+            for task in tasks:
+                if len(pending) >= max_in_flight:
+                    result = await pending.popleft()
+                    yield (result, len(pending)) if with_depth else result
+                pending.append(loop.run_in_executor(pool, fn, task))
+            while pending:
+                result = await pending.popleft()
+                yield (result, len(pending)) if with_depth else result
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _file_chunk_tasks(input_path: str, chunk_size: int) -> List[tuple]:
+        """Задачи (path, offset, length) для чанков исходного файла"""
+        file_size = os.path.getsize(input_path)
+        return [(input_path, start, min(chunk_size, file_size - start))
+                for start in range(0, file_size, chunk_size)]
+    
+    @staticmethod
+    def _parallel_line_tasks(input_path: str) -> tuple:
+        """Заголовок MFCC_PARALLEL и задачи (path, offset, length) для строк чанков"""
+        with open(input_path, 'rb') as src:
+            metadata = json.loads(src.readline().decode('utf-8'))
+            if "index" in metadata:
+                tasks = MFCC._indexed_line_tasks(input_path, metadata["index"])
+            else:
+                tasks = list(MFCC._chunk_line_tasks(input_path, src, metadata["chunks"]))
+        if len(tasks) != metadata["chunks"]:
+            raise ValueError("Несоответствие количества чанков")
+        return metadata, tasks
+    
+    @staticmethod
+    async def aiter_encoded_chunks(input_path: str, chunk_size=PARALLEL_CHUNK_SIZE, rle: str = "nibble",
+                                   adaptive: bool = True, max_in_flight=None):
+        """
+        Асинхронно отдает сжатые строки чанков (как в MFCC_PARALLEL) по порядку
+        
+        Чанки сжимаются в общем пуле; в работе не больше max_in_flight чанков
+        (по умолчанию 2 * ASYNC_MAX_WORKERS), следующий отправляется, когда
+        потребитель забрал результат.
+        """
+        if max_in_flight is None:
+            max_in_flight = 2 * ASYNC_MAX_WORKERS
+        loop = asyncio.get_running_loop()
+        tasks = await loop.run_in_executor(None, MFCC._file_chunk_tasks, input_path, chunk_size)
+        worker = functools.partial(MFCC._encode_chunk, rle=rle, adaptive=adaptive)
+        lines = MFCC._aimap_ordered(MFCC.get_async_executor(), worker, tasks, max_in_flight)
+        try:
+            async for line in lines:
+                yield line
+        finally:
+            await lines.aclose()
+    
+    @staticmethod
+    async def aiter_decoded_chunks(input_path: str, max_in_flight=None):
+        """Асинхронно отдает распакованные чанки файла MFCC_PARALLEL по порядку"""
+        if max_in_flight is None:
+            max_in_flight = 2 * ASYNC_MAX_WORKERS
+        loop = asyncio.get_running_loop()
+        metadata, tasks = await loop.run_in_executor(None, MFCC._parallel_line_tasks, input_path)
+        worker = functools.partial(MFCC._decode_chunk, rle=metadata.get("rle", "nibble"))
+        chunks = MFCC._aimap_ordered(MFCC.get_async_executor(), worker, tasks, max_in_flight)
+        try:
+            async for data in chunks:
+                yield data
+        finally:
+            await chunks.aclose()
+    
+    @staticmethod
+    async def aencode_file(input_path: str, output_path: str, container: str = "text",
+                           rle: str = "nibble", strategy: str = "size", max_in_flight=None,
+                           on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Асинхронный аналог encode_file_auto на общем пуле процессов
+        
+        Метод выбирается так же, как в encode_file_auto. Чанки MFCC_PARALLEL и
+        блоки MFCC-BIN сжимаются в пуле, nosplit - по очереди в потоке; вся
+        работа с файлами идет в потоках, события chunk приходят по мере записи.
+        Результат пишется во временный файл, поэтому при ошибке или отмене
+        старый output_path остается как был.
+        """
+        try:
+            choice = await MFCC._run_collecting(on_event, MFCC._choose_encoding, input_path,
+                                                ASYNC_MAX_WORKERS, container, rle, strategy)
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка выбора режима", e)
+            return False
+        
+        if choice["method"] == "bin":
+            return await MFCC._aencode_bin(input_path, output_path, choice["stored"],
+                                           max_in_flight, on_event)
+        if choice["method"] == "nosplit":
+            return await MFCC._aencode_nosplit(input_path, output_path, on_event)
+        
+        if choice["method"] == "mp4":
+            chunk_size, rle = MP4_CHUNK_SIZE, "nibble"
+        else:
+            chunk_size, rle = choice["chunk_size"], choice["rle"]
+        return await MFCC._aencode_parallel(input_path, output_path, chunk_size, rle,
+                                            max_in_flight, on_event)
+    
+    @staticmethod
+    async def _aencode_parallel(input_path: str, output_path: str, chunk_size: int, rle: str,
+                                max_in_flight, on_event: Optional[Callable[[Dict], None]]) -> bool:
+        """Асинхронная запись MFCC_PARALLEL: тот же формат, что у encode_large_file_parallel"""
+        if max_in_flight is None:
+            max_in_flight = 2 * ASYNC_MAX_WORKERS
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        try:
+            tasks = await loop.run_in_executor(None, MFCC._file_chunk_tasks, input_path, chunk_size)
+            file_size = sum(length for _, _, length in tasks)
+            index = [[0, start, length] for _, start, length in tasks]
+            metadata = {
+                "format": "MFCC_PARALLEL",
+                "chunks": len(tasks),
+                "original_size": file_size,
+                "chunk_size": chunk_size,
+                "rle": rle
+            }
+            MFCC._emit(on_event, "start", op="encode", input=input_path, output=output_path,
+                       total_chunks=len(tasks), total_bytes=file_size,
+                       max_workers=ASYNC_MAX_WORKERS, executor="async",
+                       message=f"🔧 Асинхронное сжатие: {file_size/(1024*1024):.1f} MB\n"
+                               f"📦 Чанков: {len(tasks)}")
+            
+            worker = functools.partial(MFCC._timed_call,
+                                       functools.partial(MFCC._encode_chunk, rle=rle, adaptive=True))
+            lines = MFCC._aimap_ordered(MFCC.get_async_executor(), worker, tasks, max_in_flight,
+                                        with_depth=True)
+            stored_chunks = 0
+            busy = 0.0
+            async with MFCC._aatomic_output(output_path, 'w', encoding='utf-8', newline='\n') as f:
+                try:
+                    header = MFCC._parallel_header(metadata, index)
+                    await loop.run_in_executor(None, f.write, header)
+                    offset = len(header)
+                    
+                    i = 0
+                    async for (compressed, latency), depth in lines:
+                        index[i][0] = offset
+                        stored = compressed.startswith(STORED_TAG)
+                        stored_chunks += stored
+                        # Запись в потоке: цикл событий не ждет диск
+                        await loop.run_in_executor(None, f.write, compressed + "\n")
+                        offset += len(compressed) + 1
+                        busy += latency
+                        MFCC._emit(on_event, "chunk", op="encode", index=i, total_chunks=len(tasks),
+                                   bytes_in=index[i][2], bytes_out=len(compressed) + 1,
+                                   latency=latency, queue_depth=depth, stored=stored)
+                        i += 1
+                finally:
+                    await lines.aclose()
+                
+                await loop.run_in_executor(None, MFCC._rewrite_start, f,
+                                           MFCC._parallel_header(metadata, index))
+            
+            elapsed = time.perf_counter() - started
+            MFCC._emit(on_event, "done", op="encode", output=output_path, chunks=len(tasks),
+                       bytes_in=file_size, bytes_out=offset, elapsed=elapsed, worker_busy=busy,
+                       utilization=busy / (elapsed * ASYNC_MAX_WORKERS) if elapsed else 0.0,
+                       stored_chunks=stored_chunks,
+                       message=f"✅ Асинхронное сжатие завершено: {output_path}")
+            return True
+            
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка асинхронного сжатия", e)
+            return False
+    
+    @staticmethod
+    async def _aencode_bin(input_path: str, output_path: str, stored: bool, max_in_flight,
+                           on_event: Optional[Callable[[Dict], None]]) -> bool:
+        """
+        Асинхронная запись MFCC-BIN: тот же формат, что у encode_file_bin
+        
+        Блоки по BIN_BLOCK_SIZE сжимаются независимо, поэтому идут в общий пул;
+        при stored блоки только копируются, и для этого хватает потоков.
+        """
+        if max_in_flight is None:
+            max_in_flight = 2 * ASYNC_MAX_WORKERS
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        try:
+            tasks = await loop.run_in_executor(None, MFCC._file_chunk_tasks, input_path, BIN_BLOCK_SIZE)
+            file_size = sum(length for _, _, length in tasks)
+            MFCC._emit(on_event, "start", op="encode", input=input_path, output=output_path,
+                       total_chunks=len(tasks), total_bytes=file_size,
+                       max_workers=ASYNC_MAX_WORKERS, executor="async",
+                       message=f"🔧 Асинхронное сжатие MFCC-BIN: {file_size/(1024*1024):.1f} MB")
+            
+            worker = functools.partial(MFCC._timed_call,
+                                       functools.partial(MFCC._encode_bin_chunk, stored=stored))
+            pool = None if stored else MFCC.get_async_executor()
+            blocks = MFCC._aimap_ordered(pool, worker, tasks, max_in_flight, with_depth=True)
+            busy = 0.0
+            async with MFCC._aatomic_output(output_path) as f:
+                try:
+                    header = MFCC._bin_header(file_size, stored)
+                    await loop.run_in_executor(None, f.write, header)
+                    written = len(header)
+                    
+                    i = 0
+                    async for (encoded, latency), depth in blocks:
+                        await loop.run_in_executor(None, f.write, encoded)
+                        written += len(encoded)
+                        busy += latency
+                        MFCC._emit(on_event, "chunk", op="encode", index=i, total_chunks=len(tasks),
+                                   bytes_in=tasks[i][2], bytes_out=len(encoded),
+                                   latency=latency, queue_depth=depth, stored=stored)
+                        i += 1
+                finally:
+                    await blocks.aclose()
+            
+            elapsed = time.perf_counter() - started
+            ratio = (1 - written / file_size) * 100 if file_size else 0.0
+            MFCC._emit(on_event, "done", op="encode", output=output_path, chunks=len(tasks),
+                       bytes_in=file_size, bytes_out=written, elapsed=elapsed, worker_busy=busy,
+                       utilization=busy / (elapsed * ASYNC_MAX_WORKERS) if elapsed else 0.0,
+                       message=f"✅ MFCC-BIN: {input_path} → {output_path}\n"
+                               f"📊 Эффективность: {ratio:.1f}%")
+            return True
+            
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка сжатия MFCC-BIN", e)
+            return False
+    
+    @staticmethod
+    async def _aencode_nosplit(input_path: str, output_path: str,
+                               on_event: Optional[Callable[[Dict], None]]) -> bool:
+        """
+        Асинхронное nosplit сжатие: тот же формат, что у encode_file_nosplit
+        
+        Серия может переходить через границу блока, поэтому блоки кодируются
+        по очереди одним MFCCEncoder - в потоке, а не в цикле событий.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        try:
+            file_size = await loop.run_in_executor(None, os.path.getsize, input_path)
+            total_chunks = -(-file_size // STREAM_BLOCK_SIZE)
+            MFCC._emit(on_event, "start", op="encode", input=input_path, output=output_path,
+                       total_chunks=total_chunks, total_bytes=file_size,
+                       max_workers=1, executor="async",
+                       message=f"🔧 Асинхронное сжатие: {file_size/(1024*1024):.1f} MB")
+            
+            encoder = MFCCEncoder()
+            async with MFCC._aopen(input_path) as src, MFCC._aatomic_output(output_path) as f:
+                pieces = MFCC._iter_encode_nosplit(src, encoder)
+                i = 0
+                consumed = 0
+                while True:
+                    block_started = time.perf_counter()
+                    size = await loop.run_in_executor(None, MFCC._write_next, pieces, f)
+                    if size is None:
+                        break
+                    if encoder.bytes_in == consumed:
+                        continue  # хвост flush(): нового блока нет
+                    MFCC._emit(on_event, "chunk", op="encode", index=i, total_chunks=total_chunks,
+                               bytes_in=encoder.bytes_in - consumed, bytes_out=size,
+                               latency=time.perf_counter() - block_started)
+                    consumed = encoder.bytes_in
+                    i += 1
+            
+            MFCC._emit(on_event, "done", op="encode", output=output_path, bytes_in=encoder.bytes_in,
+                       bytes_out=encoder.chars_out, elapsed=time.perf_counter() - started,
+                       message=f"✅ Сжатие завершено: {input_path} → {output_path}")
+            return True
             
-            decoded_data = MFCC.decode_nosplit(compressed_data)
+        except Exception as e:
+            MFCC._emit_error(on_event, "encode", "Ошибка сжатия", e)
+            return False
+    
+    @staticmethod
+    async def adecode_file(input_path: str, output_path: str, max_in_flight=None,
+                           on_event: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Асинхронный аналог decode_file_auto на общем пуле процессов
+        
+        MFCC_PARALLEL распаковывается по чанкам в пуле, MFCC-BIN и nosplit -
+        по порядку в потоке. Запись идет через временный файл, поэтому при
+        ошибке или отмене старый output_path остается как был.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        try:
+            head = await loop.run_in_executor(None, MFCC._read_head, input_path, len(PARALLEL_PREFIX))
+            if head != PARALLEL_PREFIX:
+                return await MFCC._adecode_sequential(input_path, output_path,
+                                                      head.startswith(BIN_MAGIC), on_event)
             
-            with open(output_path, 'wb') as f:
-                f.write(decoded_data)
+            MFCC._emit(on_event, "start", op="decode", input=input_path, output=output_path,
+                       max_workers=ASYNC_MAX_WORKERS, executor="async",
+                       message=f"🔧 Асинхронная распаковка: {input_path}")
+            written = 0
+            chunks = MFCC.aiter_decoded_chunks(input_path, max_in_flight)
+            async with MFCC._aatomic_output(output_path) as out:
+                try:
+                    async for data in chunks:
+                        await loop.run_in_executor(None, out.write, data)
+                        written += len(data)
+                finally:
+                    await chunks.aclose()
             
-            print(f"✅ Распаковка завершена: {input_path} → {output_path}")
+            bytes_in = await loop.run_in_executor(None, os.path.getsize, input_path)
+            MFCC._emit(on_event, "done", op="decode", output=output_path,
+                       bytes_in=bytes_in, bytes_out=written,
+                       elapsed=time.perf_counter() - started,
+                       message=f"✅ Асинхронная распаковка завершена: {output_path}")
             return True
+            
         except Exception as e:
-            print(f"❌ Ошибка распаковки: {e}")
+            MFCC._emit_error(on_event, "decode", "Ошибка асинхронной распаковки", e)
             return False
+    
+    @staticmethod
+    async def _adecode_sequential(input_path: str, output_path: str, is_bin: bool,
+                                  on_event: Optional[Callable[[Dict], None]]) -> bool:
+        """Асинхронная распаковка MFCC-BIN или nosplit: по порядку, блоками, в потоке"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        try:
+            written = 0
+            async with MFCC._aopen(input_path) as src, MFCC._aatomic_output(output_path) as out:
+                pieces = MFCC._iter_decode_bin(src) if is_bin else MFCC._iter_decode_nosplit(src, MFCCDecoder())
+                while True:
+                    size = await loop.run_in_executor(None, MFCC._write_next, pieces, out)
+                    if size is None:
+                        break
+                    written += size
+            
+            bytes_in = await loop.run_in_executor(None, os.path.getsize, input_path)
+            kind = "MFCC-BIN " if is_bin else ""
+            MFCC._emit(on_event, "done", op="decode", output=output_path,
+                       bytes_in=bytes_in, bytes_out=written,
+                       elapsed=time.perf_counter() - started,
+                       message=f"✅ Распаковка {kind}завершена: {input_path} → {output_path}")
+            return True
+            
+        except Exception as e:
+            MFCC._emit_error(on_event, "decode", "Ошибка распаковки MFCC-BIN" if is_bin else "Ошибка распаковки", e)
+            return False
+
+
+class MFCCEncoder:
+    """
+    Инкрементальный nosplit кодер: куски данных любого размера в feed(), в конце flush()
+    
+    Незакрытая серия в конце куска переносится в следующий, поэтому склеенный
+    вывод feed() и flush() совпадает с MFCC.encode_nosplit от всех данных сразу.
+    Память зависит от размера куска, а не от размера потока.
+    """
+    
+    def __init__(self):
+        self._carry = b""  # HEX символы незакрытой серии
+        self.bytes_in = 0
+        self.chars_out = 0
+    
+    def feed(self, data: Union[bytes, str, memoryview]) -> str:
+        """Кодирует очередной кусок; возвращает готовую часть вывода (может быть пустой)"""
+        return self._feed(data).decode('ascii')
+    
+    def flush(self) -> str:
+        """Дописывает перенесенную серию; после flush() кодер можно использовать заново"""
+        return self._flush().decode('ascii')
+    
+    def _feed(self, data: Union[bytes, str, memoryview]) -> bytes:
+        """feed() без перевода в str - для тех, кто пишет байты"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        view = memoryview(data).cast('B')
+        self.bytes_in += view.nbytes
+        encoded, self._carry = MFCC._encode_blocks(view, self._carry, final=False)
+        self.chars_out += len(encoded)
+        return encoded
+    
+    def _flush(self) -> bytes:
+        encoded, self._carry = MFCC._encode_blocks(memoryview(b""), self._carry, final=True)
+        self.chars_out += len(encoded)
+        return encoded
+
+
+class MFCCDecoder:
+    """
+    Инкрементальный nosplit декодер: текст любыми кусками в feed(), в конце flush()
+    
+    Токен XX|Y|, разрезанный границей куска, и непарная HEX цифра переносятся
+    в следующий кусок, поэтому склеенный вывод совпадает с MFCC.decode_nosplit.
+    """
+    
+    def __init__(self):
+        self._carry = b""  # конец текста, где может начинаться незаконченный токен
+        self._nibble = b""  # непарная HEX цифра
+        self.chars_in = 0
+        self.bytes_out = 0
+    
+    def feed(self, text: Union[bytes, str]) -> bytes:
+        """Декодирует очередной кусок; возвращает готовые байты (может быть пусто)"""
+        if isinstance(text, str):
+            # 'replace' сохраняет позиции: не-ASCII символ станет '?' и будет пропущен
+            text = text.encode('ascii', 'replace')
+        self.chars_in += len(text)
+        
+        # Последние 4 символа всегда переносятся: это может быть начало токена
+        # XX|Y| (5 символов). Токены не перекрываются, поэтому разрез задевает
+        # только токен, начавшийся в 4 символах перед ним, - тогда режем перед токеном
+        buf = self._carry + text
+        cut = max(len(buf) - 4, 0)
+        match = _TOKEN_BYTES_RE.search(buf, max(cut - 4, 0))
+        if match and match.start() < cut < match.end():
+            cut = match.start()
+        self._carry = buf[cut:]
+        
+        hex_chars = self._nibble + MFCC._expand_hex(buf[:cut])
+        even = len(hex_chars) - len(hex_chars) % 2
+        self._nibble = hex_chars[even:]
+        return self._output(binascii.unhexlify(hex_chars[:even]))
+    
+    def flush(self) -> bytes:
+        """Разбирает остаток; непарная цифра дополняется '0', как в decode_nosplit"""
+        hex_chars = self._nibble + MFCC._expand_hex(self._carry)
+        self._carry = self._nibble = b""
+        if len(hex_chars) % 2 != 0:
+            hex_chars += b'0'
+        return self._output(binascii.unhexlify(hex_chars))
+    
+    def _output(self, data: bytes) -> bytes:
+        self.bytes_out += len(data)
+        return data
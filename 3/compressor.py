@@ -6,10 +6,40 @@ MFCC Compressor с автоопределением режима и многоп
 import os
 import sys
 import argparse
-from MFCC import MFCC
+import contextlib
+from MFCC import MFCC, CACHE_DIR, CACHE_MAX_BYTES
 
-def compress_file(input_path, output_path=None):
-    """Умное сжатие с автоопределением режима"""
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
+class StreamFailed(Exception):
+    """Потоковая обработка не удалась (ошибка уже выведена)"""
+
+def compress_file(input_path, output_path=None, threads=None, executor="auto", container="text",
+                  rle="nibble", strategy="size", metrics=None, cache=None, cache_size=None,
+                  cache_link=False):
+    """
+    Умное сжатие с автоопределением режима
+    
+    Args:
+        cache: Каталог кэша результатов (None - без кэша)
+        cache_size: Предел размера кэша в байтах (None - CACHE_MAX_BYTES)
+        cache_link: Жесткая ссылка на запись кэша вместо копии
+    """
+    if STDIO in (input_path, output_path):
+        # Поток пишется nosplit текстом (или MFCC-BIN) за один проход: выбирать
+        # режим, параллелить и кэшировать здесь нечего
+        unsupported = [flag for flag, used in (("-t", threads is not None),
+                                               ("-e", executor != "auto"),
+                                               ("--rle", rle != "nibble"),
+                                               ("-s", strategy != "size"),
+                                               ("--cache", cache is not None or cache_link))
+                       if used]
+        if unsupported:
+            print(f"❌ С '-' (stdin/stdout) не поддерживается: {', '.join(unsupported)}")
+            return False
+        return compress_stream(input_path, output_path, container, metrics)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -21,24 +51,90 @@ def compress_file(input_path, output_path=None):
     print(f"🎯 Сжатие файла: {input_path}")
     print(f"📊 Размер: {file_size/(1024*1024):.1f} MB")
     
+    if cache is not None:
+        return MFCC.encode_file_cached(input_path, output_path, cache,
+                                       cache_size if cache_size is not None else CACHE_MAX_BYTES,
+                                       cache_link, threads, executor, container, rle, strategy,
+                                       on_event=MFCC.console_reporter(metrics))
+    
     # Используем автоматический режим
-    return MFCC.encode_file_auto(input_path, output_path)
+    return MFCC.encode_file_auto(input_path, output_path, max_workers=threads, executor=executor,
+                                 container=container, rle=rle, strategy=strategy,
+                                 on_event=MFCC.console_reporter(metrics))
+
+def compress_stream(input_path, output_path=None, container="text", metrics=None):
+    """
+    Потоковое сжатие, '-' - stdin/stdout (например, tar cf - . | compressor.py - | ssh ...)
+    
+    Данные читаются блоками, без временных файлов. Из stdin пишется nosplit
+    текст, MFCC-BIN доступен только для обычного файла на входе.
+    """
+    if input_path != STDIO and not os.path.exists(input_path):
+        print(f"❌ Файл не найден: {input_path}")
+        return False
+    
+    if output_path is None:
+        output_path = STDIO if input_path == STDIO else input_path + '.mfcc'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            if not MFCC.encode_stream(src, dst, container, on_event=MFCC.console_reporter(metrics)):
+                # Ошибка уже выведена: исключение откатывает _atomic_output,
+                # и прежний output_path остается нетронутым
+                raise StreamFailed
+            return True
+    except StreamFailed:
+        return False
+    except OSError as e:
+        print(f"❌ Ошибка потокового сжатия: {e}")
+        return False
 
 def main():
     parser = argparse.ArgumentParser(description='MFCC Compressor с многопоточностью')
-    parser.add_argument('input', help='Путь к файлу для сжатия')
-    parser.add_argument('-o', '--output', help='Путь для сохранения сжатого файла')
-    parser.add_argument('-t', '--threads', type=int, default=4, 
-                       help='Количество потоков (по умолчанию: 4)')
+    parser.add_argument('input', help="Путь к файлу для сжатия ('-' - stdin)")
+    parser.add_argument('-o', '--output', help="Путь для сохранения сжатого файла ('-' - stdout)")
+    parser.add_argument('-t', '--threads', type=int,
+                       help='Количество потоков (по умолчанию: 4, для MP4: 2)')
+    parser.add_argument('-e', '--executor', choices=['thread', 'process', 'auto'], default='auto',
+                       help='Воркеры: потоки, процессы или авто (по умолчанию: auto)')
+    parser.add_argument('-f', '--format', choices=['text', 'bin'], default='text',
+                       help='Контейнер: HEX текст или бинарный MFCC-BIN (по умолчанию: text)')
+    parser.add_argument('--rle', choices=['nibble', 'byte'], default='nibble',
+                       help='RLE по HEX символам или по байтам (по умолчанию: nibble)')
+    parser.add_argument('-s', '--strategy', choices=['size', 'sample'], default='size',
+                       help='Выбор режима: по размеру файла или по выборке данных '
+                            '(несжимаемое хранится как есть; по умолчанию: size)')
+    parser.add_argument('--metrics', metavar='FILE',
+                       help='Дописывать события и метрики (JSON строки) в файл для мониторинга')
+    parser.add_argument('--cache', nargs='?', const=CACHE_DIR, metavar='DIR',
+                       help=f'Брать неизменившиеся файлы из кэша результатов (по умолчанию: {CACHE_DIR})')
+    parser.add_argument('--cache-size', type=int, metavar='MB',
+                       help=f'Предел размера кэша в MB (по умолчанию: {CACHE_MAX_BYTES // (1024*1024)})')
+    parser.add_argument('--cache-link', action='store_true',
+                       help='При попадании делать жесткую ссылку на запись кэша вместо копии '
+                            '(файл будет только для чтения)')
     
     args = parser.parse_args()
     
-    print("🎉 === MFCC Compressor ===")
-    print("🚀 Умное сжатие с многопоточностью")
-    print("🎥 Специальная поддержка MP4")
-    print("=" * 50)
+    # Когда сжатые данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.input == STDIO and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        print("🎉 === MFCC Compressor ===")
+        print("🚀 Умное сжатие с многопоточностью")
+        print("🎥 Специальная поддержка MP4")
+        print("=" * 50)
+        
+        ok = compress_file(args.input, args.output, args.threads, args.executor, args.format,
+                           args.rle, args.strategy, args.metrics, args.cache,
+                           args.cache_size * 1024 * 1024 if args.cache_size is not None else None,
+                           args.cache_link)
     
-    compress_file(args.input, args.output)
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -4,11 +4,22 @@ MFCC Opener с автоопределением режима распаковк
 """
 
 import os
+import sys
 import argparse
+import contextlib
 from MFCC import MFCC
 
-def decompress_file(input_path, output_path=None):
+# Путь '-' означает stdin (вход) или stdout (выход)
+STDIO = '-'
+
+class StreamFailed(Exception):
+    """Потоковая обработка не удалась (ошибка уже выведена)"""
+
+def decompress_file(input_path, output_path=None, metrics=None):
     """Умная распаковка с автоопределением режима"""
+    if STDIO in (input_path, output_path):
+        return decompress_stream(input_path, output_path, metrics)
+    
     if not os.path.exists(input_path):
         print(f"❌ Файл не найден: {input_path}")
         return False
@@ -22,20 +33,63 @@ def decompress_file(input_path, output_path=None):
     print(f"🎯 Распаковка файла: {input_path}")
     
     # Используем автоматический режим
-    return MFCC.decode_file_auto(input_path, output_path)
+    return MFCC.decode_file_auto(input_path, output_path, on_event=MFCC.console_reporter(metrics))
+
+def decompress_stream(input_path, output_path=None, metrics=None):
+    """
+    Потоковая распаковка, '-' - stdin/stdout (например, ssh ... | open.py - | tar xf -)
+    
+    Данные читаются блоками, без временных файлов и без многопоточности.
+    """
+    if input_path != STDIO and not os.path.exists(input_path):
+        print(f"❌ Файл не найден: {input_path}")
+        return False
+    
+    if output_path is None:
+        if input_path == STDIO:
+            output_path = STDIO
+        elif input_path.endswith('.mfcc'):
+            output_path = input_path[:-5]
+        else:
+            output_path = input_path + '.decompressed'
+    
+    try:
+        # sys.__stdout__ - настоящий stdout, даже когда сообщения перенаправлены в stderr
+        with contextlib.ExitStack() as stack:
+            src = sys.__stdin__.buffer if input_path == STDIO else stack.enter_context(open(input_path, 'rb'))
+            dst = (sys.__stdout__.buffer if output_path == STDIO
+                   else stack.enter_context(MFCC._atomic_output(output_path)))
+            if not MFCC.decode_stream(src, dst, on_event=MFCC.console_reporter(metrics)):
+                # Ошибка уже выведена: исключение откатывает _atomic_output,
+                # и прежний output_path остается нетронутым
+                raise StreamFailed
+            return True
+    except StreamFailed:
+        return False
+    except OSError as e:
+        print(f"❌ Ошибка потоковой распаковки: {e}")
+        return False
 
 def main():
     parser = argparse.ArgumentParser(description='MFCC Opener с автоопределением')
-    parser.add_argument('input', help='MFCC файл для распаковки')
-    parser.add_argument('-o', '--output', help='Выходной файл')
+    parser.add_argument('input', help="MFCC файл для распаковки ('-' - stdin)")
+    parser.add_argument('-o', '--output', help="Выходной файл ('-' - stdout)")
+    parser.add_argument('--metrics', metavar='FILE',
+                       help='Дописывать события и метрики (JSON строки) в файл для мониторинга')
     
     args = parser.parse_args()
     
-    print("🎉 === MFCC File Opener ===")
-    print("🚀 Умная распаковка с автоопределением режима")
-    print("=" * 50)
+    # Когда распакованные данные идут в stdout, все сообщения уходят в stderr
+    to_stdout = args.output == STDIO or (args.input == STDIO and args.output is None)
+    with contextlib.redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        print("🎉 === MFCC File Opener ===")
+        print("🚀 Умная распаковка с автоопределением режима")
+        print("=" * 50)
+        
+        ok = decompress_file(args.input, args.output, args.metrics)
     
-    decompress_file(args.input, args.output)
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+MFCC Benchmark - воспроизводимые замеры всех путей кодека
+
+Генерирует синтетические корпуса (нули, случайные данные, текст, длинные серии,
+MP4-подобные данные, много мелких файлов), меряет скорость сжатия и распаковки,
+пиковое потребление памяти и степень сжатия и пишет результаты в JSON,
+чтобы прогоны можно было сравнивать между собой.
+
+Каждый замер выполняется в отдельном процессе (spawn), поэтому пиковая память
+относится только к этому замеру.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from queue import Empty
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CORPORA = ["zeros", "random", "text", "runs", "mp4", "small_files"]
+
+# Путь кодека -> (версия, подходящие корпуса, учитывает ли число воркеров)
+PATHS = {
+    "nosplit-v1": ("1", ["zeros", "random", "text", "runs", "mp4"], False),
+    "nosplit-v2": ("2", ["zeros", "random", "text", "runs", "mp4"], False),
+    "nosplit-v3": ("3", ["zeros", "random", "text", "runs", "mp4"], False),
+    "bin-v3": ("3", ["zeros", "random", "text", "runs", "mp4"], False),
+    "parallel-v3": ("3", ["zeros", "random", "text", "runs", "mp4"], True),
+    "split-v2": ("2", ["small_files"], True),
+}
+
+WORDS = (b"the codec run length hex nibble chunk archive index header stream "
+         b"worker buffer block token literal carry offset entry format").split()
+
+# === КОРПУСА ===
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(8 * size).to_bytes(size, 'little') if size else b""
+
+def _gen_text(rng: random.Random, size: int) -> bytes:
+    out = bytearray()
+    while len(out) < size:
+        line = b" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+        out += line.capitalize() + b".\n"
+    return bytes(out[:size])
+
+def _gen_runs(rng: random.Random, size: int) -> bytes:
+    out = bytearray()
+    while len(out) < size:
+        out += bytes([rng.randrange(256)]) * rng.randint(16, 4096)
+    return bytes(out[:size])
+
+def _gen_mp4(rng: random.Random, size: int) -> bytes:
+    """Похоже на MP4: заголовки box'ов, сжатые кадры (шум) и выравнивание нулями"""
+    out = bytearray(b"\x00\x00\x00\x20ftypisom\x00\x00\x02\x00isomiso2avc1mp41")
+    out += b"\x00\x00\x10\x00moov" + _gen_runs(rng, 4088)
+    while len(out) < size:
+        frame = rng.randint(2048, 65536)
+        out += frame.to_bytes(4, 'big') + b"mdat" + _random_bytes(rng, frame)
+        out += b"\x00" * rng.choice([0, 0, 512, 4096])
+    return bytes(out[:size])
+
+GENERATORS = {
+    "zeros": lambda rng, size: b"\x00" * size,
+    "random": _random_bytes,
+    "text": _gen_text,
+    "runs": _gen_runs,
+    "mp4": _gen_mp4,
+}
+
+def make_corpus(workdir: str, name: str, size: int, seed: int) -> str:
+    """Создает корпус (файл или папку) в workdir, если его еще нет"""
+    path = os.path.join(workdir, f"{name}-{size}")
+    if os.path.exists(path):
+        return path
+
+    rng = random.Random(f"{seed}-{name}-{size}")
+    if name != "small_files":
+        with open(path, 'wb') as f:
+            f.write(GENERATORS[name](rng, size))
+        return path
+
+    # Много мелких файлов по подпапкам, часть - копии (как в логах и сборках)
+    tmp_path = path + ".tmp"
+    os.makedirs(tmp_path)
+    total = index = 0
+    kinds = ["text", "runs", "random", "zeros"]
+    while total < size:
+        file_size = min(rng.choice([0, 64, 512, 2048, 8192, 32768]), size - total)
+        sub = os.path.join(tmp_path, f"d{index % 16}", f"e{index % 5}")
+        os.makedirs(sub, exist_ok=True)
+        kind = kinds[index % len(kinds)]
+        data = GENERATORS[kind](random.Random(f"{seed}-{index % 97}"), file_size)
+        with open(os.path.join(sub, f"f{index}.{kind}"), 'wb') as f:
+            f.write(data)
+        total += file_size
+        index += 1
+    os.rename(tmp_path, path)
+    return path
+
+# === ЗАМЕРЫ ===
+def _peak_rss_kb():
+    """Пиковая RSS процесса и его детей (пулы воркеров) в КБ"""
+    if resource is None:
+        return None, None
+    scale = 1024 if sys.platform == "darwin" else 1  # на macOS ru_maxrss в байтах
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale)
+
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(path) for name in files)
+
+def _same_tree(a: str, b: str) -> bool:
+    for root, _, files in os.walk(a):
+        for name in files:
+            src = os.path.join(root, name)
+            dst = os.path.join(b, os.path.relpath(src, a))
+            with open(src, 'rb') as f1, open(dst, 'rb') as f2:
+                if f1.read() != f2.read():
+                    return False
+    return True
+
+def _run_path(MFCC, path: str, source: str, scratch: str, workers: int, chunk_size: int):
+    """Сжимает и распаковывает source; возвращает (время сжатия, распаковки, размер, совпало)"""
+    packed = os.path.join(scratch, "packed.mfcc")
+    unpacked = os.path.join(scratch, "unpacked")
+
+    if path.startswith("nosplit"):
+        # В 1/ у того же формата без заголовка нет суффикса _nosplit
+        encode, decode = ((MFCC.encode, MFCC.decode) if path == "nosplit-v1"
+                          else (MFCC.encode_nosplit, MFCC.decode_nosplit))
+        with open(source, 'rb') as f:
+            data = f.read()
+        start = time.perf_counter()
+        compressed = encode(data)
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = decode(compressed)
+        decode_s = time.perf_counter() - start
+        return encode_s, decode_s, len(compressed), restored == data
+
+    start = time.perf_counter()
+    if path == "bin-v3":
+        ok = MFCC.encode_file_bin(source, packed)
+    elif path == "parallel-v3":
+        ok = MFCC.encode_large_file_parallel(source, packed, chunk_size=chunk_size, max_workers=workers)
+    else:
+        ok = MFCC.encode_file_split([source], packed, max_workers=workers)
+    encode_s = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError(f"{path}: сжатие не удалось")
+
+    start = time.perf_counter()
+    if path == "bin-v3":
+        ok = MFCC.decode_file_bin(packed, unpacked)
+    elif path == "parallel-v3":
+        ok = MFCC.decode_large_file_parallel(packed, unpacked, max_workers=workers)
+    else:
+        ok = MFCC.decode_file_split(packed, unpacked, max_workers=workers)
+    decode_s = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError(f"{path}: распаковка не удалась")
+
+    if os.path.isdir(source):
+        same = _same_tree(source, os.path.join(unpacked, os.path.basename(source)))
+    else:
+        with open(source, 'rb') as f1, open(unpacked, 'rb') as f2:
+            same = f1.read() == f2.read()
+    return encode_s, decode_s, os.path.getsize(packed), same
+
+def _run_case(case: dict, queue):
+    """Выполняется в отдельном процессе: один путь, один корпус, одно число воркеров"""
+    try:
+        sys.path.insert(0, os.path.join(ROOT, case["version"]))
+        from MFCC import MFCC
+
+        best_encode = best_decode = None
+        for _ in range(case["repeat"]):
+            scratch = tempfile.mkdtemp(prefix="mfcc-bench-", dir=case["workdir"])
+            try:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    encode_s, decode_s, compressed_size, same = _run_path(
+                        MFCC, case["path"], case["source"], scratch, case["workers"], case["chunk_size"])
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+            best_encode = encode_s if best_encode is None else min(best_encode, encode_s)
+            best_decode = decode_s if best_decode is None else min(best_decode, decode_s)
+
+        original_size = _tree_size(case["source"])
+        peak_rss_kb, peak_rss_children_kb = _peak_rss_kb()
+        queue.put({
+            "encode_s": best_encode,
+            "decode_s": best_decode,
+            "encode_mb_s": original_size / best_encode / 1e6 if best_encode else None,
+            "decode_mb_s": original_size / best_decode / 1e6 if best_decode else None,
+            "original_size": original_size,
+            "compressed_size": compressed_size,
+            "ratio": compressed_size / original_size if original_size else None,
+            "peak_rss_kb": peak_rss_kb,
+            "peak_rss_children_kb": peak_rss_children_kb,
+            "roundtrip_ok": same,
+            "numpy": getattr(sys.modules["MFCC"], "np", None) is not None,
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+def run_case(case: dict, timeout: float = None) -> dict:
+    """
+    Запускает замер в свежем процессе, чтобы пиковая память не смешивалась
+    
+    Если процесс упал (в том числе убит по OOM) или не уложился в timeout
+    секунд, замер записывается как ошибка, а не ждет результата вечно.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(case, queue))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                return queue.get(timeout=1.0)
+            except Empty:
+                pass
+            if not process.is_alive():
+                # Результат мог попасть в очередь прямо перед выходом
+                try:
+                    return queue.get(timeout=1.0)
+                except Empty:
+                    return {"error": f"процесс замера завершился с кодом {process.exitcode} без результата"}
+            if deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                return {"error": f"превышен таймаут {timeout:g} с"}
+    finally:
+        process.join()
+
+# === CLI ===
+def parse_size(text: str) -> int:
+    """'512K', '8M', '1G' или число байт"""
+    text = text.strip().upper()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='MFCC Benchmark - замеры скорости, памяти и степени сжатия',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Примеры:
+  python benchmark.py                                  # Все пути и корпуса
+  python benchmark.py -p parallel-v3 -w 1,2,4,8        # Масштабирование по воркерам
+  python benchmark.py -c runs,mp4 -s 16M -o after.json # Свои корпуса и размер
+        '''
+    )
+    parser.add_argument('-p', '--paths', default=",".join(PATHS),
+                       help=f'Пути кодека через запятую (по умолчанию: все): {", ".join(PATHS)}')
+    parser.add_argument('-c', '--corpora', default=",".join(CORPORA),
+                       help=f'Корпуса через запятую (по умолчанию: все): {", ".join(CORPORA)}')
+    parser.add_argument('-s', '--sizes', default="1M,4M",
+                       help='Размеры корпусов через запятую (по умолчанию: 1M,4M)')
+    parser.add_argument('-w', '--workers', default="1,4",
+                       help='Число воркеров через запятую (по умолчанию: 1,4)')
+    parser.add_argument('--chunk-size', default="1M",
+                       help='Размер чанка для parallel-v3 (по умолчанию: 1M)')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                       help='Повторов на замер, берется лучшее время (по умолчанию: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed генератора корпусов')
+    parser.add_argument('--timeout', type=float,
+                       help='Предел времени на замер в секундах (по умолчанию: без предела)')
+    parser.add_argument('--workdir', help='Папка для корпусов (по умолчанию: временная)')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='Файл для результатов JSON')
+
+    args = parser.parse_args()
+    paths = [p for p in args.paths.split(",") if p]
+    corpora = [c for c in args.corpora.split(",") if c]
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s]
+    workers = [int(w) for w in args.workers.split(",") if w]
+    for path in paths:
+        if path not in PATHS:
+            parser.error(f"неизвестный путь: {path}")
+    for corpus in corpora:
+        if corpus not in CORPORA:
+            parser.error(f"неизвестный корпус: {corpus}")
+
+    print("🎉 === MFCC Benchmark ===")
+    print("=" * 60)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mfcc-corpora-")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        for path in paths:
+            version, path_corpora, uses_workers = PATHS[path]
+            for corpus in corpora:
+                if corpus not in path_corpora:
+                    continue
+                for size in sizes:
+                    source = make_corpus(workdir, corpus, size, args.seed)
+                    for worker_count in (workers if uses_workers else [1]):
+                        case = {"path": path, "version": version, "corpus": corpus, "size": size,
+                                "workers": worker_count, "chunk_size": parse_size(args.chunk_size),
+                                "repeat": args.repeat, "source": source, "workdir": workdir}
+                        result = run_case(case, args.timeout)
+                        results.append(dict({k: case[k] for k in ("path", "corpus", "size", "workers")},
+                                            **result))
+
+                        label = f"{path:12} {corpus:12} {size:>10} w={worker_count}"
+                        if "error" in result:
+                            print(f"❌ {label}: {result['error']}")
+                        else:
+                            print(f"📊 {label}: сжатие {result['encode_mb_s']:.2f} МБ/с, "
+                                  f"распаковка {result['decode_mb_s']:.2f} МБ/с, "
+                                  f"ratio {result['ratio']:.3f}, RSS {result['peak_rss_kb']} КБ"
+                                  + ("" if result["roundtrip_ok"] else " ⚠️  НЕ СОВПАЛО"))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "sizes": sizes,
+            "workers": workers,
+            "chunk_size": parse_size(args.chunk_size),
+            "repeat": args.repeat,
+            "timeout": args.timeout,
+        },
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Результаты: {args.output}")
+
+if __name__ == "__main__":
+    main()